@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from recipes.models import Ingredient, Recipe, Tag
+
+        from .catalogue import catalogue_changed
+        from .local_cache import forget_recipe
+        from .middleware import install_execute_wrapper
+
+        for model in (Ingredient, Tag):
+            post_save.connect(catalogue_changed, sender=model)
+            post_delete.connect(catalogue_changed, sender=model)
+        post_save.connect(forget_recipe, sender=Recipe)
+        post_delete.connect(forget_recipe, sender=Recipe)
+
+        if settings.INSTRUMENTATION_ENABLED or settings.METRICS_ENABLED:
+            connection_created.connect(install_execute_wrapper)
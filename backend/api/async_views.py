@@ -0,0 +1,188 @@
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils.translation import gettext_lazy as _
+from recipes.models import Ingredient, Tag
+from recipes.shopping_list import get_shopping_list, shopping_list_lines
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from .catalogue import list_ingredients, list_tags
+from .metrics import SHOPPING_LIST_EXPORT_BYTES, SHOPPING_LIST_EXPORT_DURATION
+from .serializers import IngredientSerializer, TagSerializer
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def run_in_thread(func):
+    """Выполняет синхронную функцию с ORM в пуле потоков.
+
+    В отличие от sync_to_async(thread_sensitive=True) запросы разных
+    клиентов не выстраиваются в очередь к одному потоку. Соединения
+    закрываются так же, как в конце обычного запроса.
+    """
+
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+async def fetch_all(queryset):
+    """Список объектов queryset через асинхронный ORM, если он есть."""
+    if hasattr(queryset, "aiterator"):
+        return [item async for item in queryset]
+    return await run_in_thread(list)(queryset)
+
+
+async def fetch_first(queryset):
+    """Первый объект queryset или None."""
+    if hasattr(queryset, "afirst"):
+        return await queryset.afirst()
+    return await run_in_thread(queryset.first)()
+
+
+def render(data, status=200):
+    """Ответ в JSON тем же рендерером, что и у представлений DRF."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(
+        renderer.render(data),
+        status=status,
+        content_type=renderer.media_type,
+    )
+
+
+def render_error(exc):
+    """Ответ с ошибкой, как у обработчика исключений DRF."""
+    response = render({"detail": exc.detail}, status=exc.status_code)
+    if isinstance(
+        exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+    ):
+        response["WWW-Authenticate"] = TokenAuthentication.keyword
+    return response
+
+
+async def authenticate(request):
+    """Асинхронный аналог TokenAuthentication с теми же ошибками."""
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if not header or header[0].lower() != "token":
+        return None
+    if len(header) == 1:
+        raise exceptions.AuthenticationFailed(
+            _("Invalid token header. No credentials provided.")
+        )
+    if len(header) > 2:
+        raise exceptions.AuthenticationFailed(
+            _("Invalid token header. Token string should not contain spaces.")
+        )
+    token = await fetch_first(
+        Token.objects.select_related("user").filter(key=header[1])
+    )
+    if token is None:
+        raise exceptions.AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+    return token.user
+
+
+def read_only(fallback):
+    """Отдаёт небезопасные методы синхронному представлению DRF."""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            return await view(request, *args, **kwargs)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+@read_only(TagViewSet.as_view({"get": "list"}))
+async def tag_list(request):
+    """Асинхронный список тегов"""
+    return render(await run_in_thread(list_tags)())
+
+
+@read_only(TagViewSet.as_view({"get": "retrieve"}))
+async def tag_detail(request, pk):
+    """Асинхронный просмотр тега"""
+    tag = await fetch_first(Tag.objects.filter(pk=pk))
+    if tag is None:
+        return render_error(exceptions.NotFound())
+    return render(TagSerializer(tag).data)
+
+
+@read_only(IngredientViewSet.as_view({"get": "list", "post": "create"}))
+async def ingredient_list(request):
+    """Асинхронный список ингредиентов с поиском по началу названия"""
+    terms = (
+        request.GET.get(api_settings.SEARCH_PARAM, "")
+        .replace(",", " ")
+        .split()
+    )
+    return render(await run_in_thread(list_ingredients)(terms))
+
+
+@read_only(
+    IngredientViewSet.as_view(
+        {
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        }
+    )
+)
+async def ingredient_detail(request, pk):
+    """Асинхронный просмотр ингредиента"""
+    ingredient = await fetch_first(Ingredient.objects.filter(pk=pk))
+    if ingredient is None:
+        return render_error(exceptions.NotFound())
+    return render(IngredientSerializer(ingredient).data)
+
+
+download_shopping_cart_view = RecipeViewSet.as_view(
+    {"get": "download_shopping_cart"}
+)
+
+
+@read_only(download_shopping_cart_view)
+async def download_shopping_cart(request):
+    """Асинхронная выгрузка списка покупок.
+
+    В списке по строке на ингредиент, поэтому он отдаётся одним ответом:
+    Django 3.2 не умеет отдавать асинхронный поток. Выгрузки в PDF и HTML
+    готовит синхронное представление.
+    """
+    if request.GET.get("type", "txt") != "txt":
+        return await sync_to_async(download_shopping_cart_view)(request)
+    try:
+        user = await authenticate(request)
+    except exceptions.AuthenticationFailed as exc:
+        return render_error(exc)
+    if user is None:
+        return render_error(exceptions.NotAuthenticated())
+
+    start = time.perf_counter()
+    buy_list = await run_in_thread(get_shopping_list)(user)
+    content = "".join(shopping_list_lines(buy_list)).encode()
+    SHOPPING_LIST_EXPORT_DURATION.observe(time.perf_counter() - start)
+    SHOPPING_LIST_EXPORT_BYTES.observe(len(content))
+
+    response = HttpResponse(content, content_type="text/plain")
+    response["Content-Disposition"] = "attachment; filename=shopping-list.txt"
+    return response
@@ -0,0 +1,46 @@
+"""Пакетное чтение по списку идентификаторов: ?ids=1,2,3.
+
+Ответ — список объектов в порядке ids без пагинации. Несуществующие
+и недоступные идентификаторы пропускаются, повторы выводятся один раз.
+"""
+from django.conf import settings
+from rest_framework import exceptions
+
+IDS_PARAM = "ids"
+
+
+def is_batch(request):
+    return IDS_PARAM in request.query_params
+
+
+def parse_ids(request):
+    """Идентификаторы из ?ids= без повторов, в порядке запроса."""
+    ids = []
+    for param in request.query_params.getlist(IDS_PARAM):
+        for value in param.split(","):
+            if not value.strip():
+                continue
+            try:
+                pk = int(value)
+            except ValueError:
+                raise exceptions.ValidationError(
+                    {IDS_PARAM: [f"Неверный идентификатор: {value}"]}
+                )
+            if pk not in ids:
+                ids.append(pk)
+    if len(ids) > settings.API_BATCH_MAX_IDS:
+        raise exceptions.ValidationError(
+            {
+                IDS_PARAM: [
+                    "Можно запросить не больше "
+                    f"{settings.API_BATCH_MAX_IDS} объектов"
+                ]
+            }
+        )
+    return ids
+
+
+def in_request_order(items, ids, key):
+    """items в порядке ids, key(item) — идентификатор объекта."""
+    positions = {pk: position for position, pk in enumerate(ids)}
+    return sorted(items, key=lambda item: positions[key(item)])
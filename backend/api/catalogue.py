@@ -0,0 +1,302 @@
+"""Общий для всех воркеров снимок каталога тегов и ингредиентов.
+
+Каталог выгружается в двоичный файл, который каждый воркер открывает через
+mmap только для чтения: страницы файла лежат в page cache один раз на
+машину, а не в куче каждого процесса. Файл пересобирается целиком и
+подменяется атомарно (запись во временный файл и os.replace), воркеры
+замечают новую версию по os.stat при следующем запросе.
+
+Формат (все числа little-endian):
+
+* заголовок HEADER;
+* записи ингредиентов INGREDIENT в порядке сортировки базы;
+* индекс — номера записей ингредиентов (uint32), отсортированные по
+  названию в нижнем регистре, для поиска по началу названия;
+* единицы измерения — пары (смещение, длина) строк;
+* записи тегов TAG;
+* строки в UTF-8, смещения отсчитываются от начала этого блока.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from recipes.models import Ingredient, Tag
+
+from .fast_serializers import INGREDIENT_FIELDS, TAG_FIELDS
+from .local_cache import clear_catalogue, get_ingredients, get_tags
+
+MAGIC = b"FGCS"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sH2xQ8I")
+INGREDIENT = struct.Struct("<q4IH2x")
+INDEX = struct.Struct("<I")
+STRING = struct.Struct("<2I")
+TAG = struct.Struct("<q6I")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class StringTable:
+    """Блок строк снимка, одинаковые строки хранятся один раз."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, value):
+        encoded = value.encode()
+        if encoded not in self.offsets:
+            self.offsets[encoded] = len(self.data)
+            self.data += encoded
+        return self.offsets[encoded], len(encoded)
+
+
+def build_snapshot(path=None):
+    """Выгружает каталог из базы в новый файл снимка и подменяет старый."""
+    path = path or settings.CATALOGUE_SNAPSHOT_PATH
+    ingredients = list(Ingredient.objects.values_list(*INGREDIENT_FIELDS))
+    tags = list(Tag.objects.values_list(*TAG_FIELDS))
+
+    strings = StringTable()
+    units = []
+    unit_positions = {}
+    records = bytearray()
+    keys = []
+    for number, (pk, name, unit) in enumerate(ingredients):
+        if unit not in unit_positions:
+            unit_positions[unit] = len(units)
+            units.append(strings.add(unit))
+        key = name.lower()
+        keys.append((key.encode(), number))
+        records += INGREDIENT.pack(
+            pk, *strings.add(name), *strings.add(key), unit_positions[unit]
+        )
+    index = b"".join(INDEX.pack(number) for _, number in sorted(keys))
+    unit_table = b"".join(STRING.pack(*unit) for unit in units)
+    tag_records = b"".join(
+        TAG.pack(
+            pk,
+            *strings.add(name),
+            *strings.add(color),
+            *strings.add(slug),
+        )
+        for pk, name, color, slug in tags
+    )
+
+    ingredients_offset = HEADER.size
+    index_offset = ingredients_offset + len(records)
+    units_offset = index_offset + len(index)
+    tags_offset = units_offset + len(unit_table)
+    strings_offset = tags_offset + len(tag_records)
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        time.time_ns(),
+        len(ingredients),
+        len(units),
+        len(tags),
+        ingredients_offset,
+        index_offset,
+        units_offset,
+        tags_offset,
+        strings_offset,
+    )
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            for part in (header, records, index, unit_table, tag_records):
+                file.write(part)
+            file.write(strings.data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class CatalogueSnapshot:
+    """Снимок каталога, открытый через mmap только для чтения."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self.size = stat.st_size
+            self.buffer = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (
+            magic,
+            format_version,
+            self.generation,
+            self.ingredient_count,
+            self.unit_count,
+            self.tag_count,
+            self.ingredients_offset,
+            self.index_offset,
+            self.units_offset,
+            self.tags_offset,
+            self.strings_offset,
+        ) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: неизвестный формат снимка")
+        self.units = [
+            self.string(
+                *STRING.unpack_from(
+                    self.buffer, self.units_offset + number * STRING.size
+                )
+            )
+            for number in range(self.unit_count)
+        ]
+
+    def raw(self, offset, length):
+        start = self.strings_offset + offset
+        return self.buffer[start:start + length]
+
+    def string(self, offset, length):
+        return self.raw(offset, length).decode()
+
+    def record(self, number):
+        return INGREDIENT.unpack_from(
+            self.buffer, self.ingredients_offset + number * INGREDIENT.size
+        )
+
+    def ingredient(self, number):
+        pk, name_offset, name_length, _, _, unit = self.record(number)
+        return dict(
+            zip(
+                INGREDIENT_FIELDS,
+                (pk, self.string(name_offset, name_length), self.units[unit]),
+            )
+        )
+
+    def key(self, position):
+        (number,) = INDEX.unpack_from(
+            self.buffer, self.index_offset + position * INDEX.size
+        )
+        return self.raw(*self.record(number)[3:5]), number
+
+    def search(self, prefix):
+        """Номера записей, ключ которых начинается с prefix (байты)."""
+        low, high = 0, self.ingredient_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle)[0] < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        numbers = []
+        for position in range(low, self.ingredient_count):
+            key, number = self.key(position)
+            if not key.startswith(prefix):
+                break
+            numbers.append(number)
+        return numbers
+
+    def ingredients(self, terms=()):
+        """Ингредиенты в порядке базы, как SearchFilter с полем ^name."""
+        if not terms:
+            return [
+                self.ingredient(number)
+                for number in range(self.ingredient_count)
+            ]
+        prefixes = [term.lower().encode() for term in terms]
+        numbers = self.search(max(prefixes, key=len))
+        return [
+            self.ingredient(number)
+            for number in sorted(numbers)
+            if all(
+                self.raw(*self.record(number)[3:5]).startswith(prefix)
+                for prefix in prefixes
+            )
+        ]
+
+    def tags(self):
+        result = []
+        for number in range(self.tag_count):
+            pk, *strings = TAG.unpack_from(
+                self.buffer, self.tags_offset + number * TAG.size
+            )
+            values = [
+                self.string(strings[index], strings[index + 1])
+                for index in range(0, len(strings), 2)
+            ]
+            result.append(dict(zip(TAG_FIELDS, [pk, *values])))
+        return result
+
+
+current_snapshot = None
+snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Текущий снимок каталога, при необходимости открывает новую версию.
+
+    Старый mmap не закрывается явно: его ещё могут читать другие потоки,
+    он освободится вместе с последней ссылкой.
+    """
+    global current_snapshot
+    path = settings.CATALOGUE_SNAPSHOT_PATH
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        build_snapshot(path)
+        stat = os.stat(path)
+    snapshot = current_snapshot
+    if snapshot is None or snapshot.identity != (
+        stat.st_ino,
+        stat.st_mtime_ns,
+    ):
+        with snapshot_lock:
+            snapshot = current_snapshot
+            if snapshot is None or snapshot.identity != (
+                stat.st_ino,
+                stat.st_mtime_ns,
+            ):
+                snapshot = current_snapshot = CatalogueSnapshot(path)
+    return snapshot
+
+
+def list_tags():
+    if settings.CATALOGUE_SNAPSHOT_PATH:
+        return get_snapshot().tags()
+    return [tag.to_dict() for tag in get_tags()]
+
+
+def list_ingredients(terms=()):
+    if settings.CATALOGUE_SNAPSHOT_PATH:
+        return get_snapshot().ingredients(terms)
+    return get_ingredients().filter(terms)
+
+
+def rebuild_after_commit():
+    build_snapshot()
+
+
+def catalogue_changed(sender, **kwargs):
+    """Сбрасывает кеш процесса и пересобирает снимок после коммита.
+
+    Пересборка планируется один раз на транзакцию, поэтому loaddata
+    или массовое редактирование в админке не пересобирают файл на
+    каждый объект.
+    """
+    clear_catalogue(sender)
+    if not settings.CATALOGUE_SNAPSHOT_PATH:
+        return
+    connection = transaction.get_connection()
+    if not any(
+        func is rebuild_after_commit for _, func in connection.run_on_commit
+    ):
+        transaction.on_commit(rebuild_after_commit)
@@ -0,0 +1,96 @@
+"""Счётчики фильтров ленты рецептов одним запросом.
+
+Для текущих параметров RecipeFilter считаются: число рецептов, число
+рецептов с каждым тегом, в избранном и в списке покупок пользователя.
+Все счётчики — агрегаты COUNT(...) FILTER (WHERE ...) в одном запросе
+по рецептам, отобранным остальными фильтрами. Счётчик тега не учитывает
+выбор тегов в запросе: теги объединяются по ИЛИ, и выбор одного тега
+не должен обнулять счётчики остальных. Ответы анонимным клиентам
+кешируются в воркере по набору значений фильтров.
+"""
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django_filters.utils import translate_validation
+from recipes.models import Favorite, ShopingList
+from recipes.tag_mask import mask_of
+
+from .filters import RecipeFilter
+from .local_cache import facet_cache, get_tag_bits
+
+TAGS_FILTER = "tags"
+
+
+def filter_signature(cleaned_data):
+    """Ключ кеша: значения фильтров, от которых зависят счётчики."""
+    signature = []
+    for name, value in sorted(cleaned_data.items()):
+        if name == TAGS_FILTER:
+            value = tuple(sorted(tag.slug for tag in value or ()))
+        elif hasattr(value, "pk"):
+            value = value.pk
+        signature.append((name, value))
+    return tuple(signature)
+
+
+def count_facets(queryset, tags, user):
+    tag_bits = get_tag_bits()
+    aliases = {
+        f"tag_{bit}": F("tags_mask").bitand(1 << bit) for _, bit in tag_bits
+    }
+    selected = Q()
+    if tags:
+        aliases["selected_tags"] = F("tags_mask").bitand(
+            mask_of(tag.bit for tag in tags)
+        )
+        selected = Q(selected_tags__gt=0)
+    aggregates = {
+        "count": Count("pk", filter=selected),
+        **{
+            f"tag_{bit}": Count("pk", filter=Q(**{f"tag_{bit}__gt": 0}))
+            for _, bit in tag_bits
+        },
+    }
+    if user.is_authenticated:
+        aliases["favorited"] = Exists(
+            Favorite.objects.filter(user=user, recipe_id=OuterRef("pk"))
+        )
+        aliases["in_cart"] = Exists(
+            ShopingList.objects.filter(user=user, recipe_id=OuterRef("pk"))
+        )
+        aggregates["is_favorited"] = Count(
+            "pk", filter=selected & Q(favorited=True)
+        )
+        aggregates["is_in_shopping_cart"] = Count(
+            "pk", filter=selected & Q(in_cart=True)
+        )
+    counts = queryset.annotate(**aliases).aggregate(**aggregates)
+    return {
+        "count": counts["count"],
+        "tags": {slug: counts[f"tag_{bit}"] for slug, bit in tag_bits},
+        "is_favorited": counts.get("is_favorited", 0),
+        "is_in_shopping_cart": counts.get("is_in_shopping_cart", 0),
+    }
+
+
+def recipe_facets(request, queryset):
+    """Счётчики фильтров для параметров запроса request."""
+    filterset = RecipeFilter(
+        request.query_params, queryset=queryset, request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    cleaned_data = filterset.form.cleaned_data
+    anonymous = not request.user.is_authenticated
+    if anonymous:
+        key = filter_signature(cleaned_data)
+        facets = facet_cache.get(key)
+        if facets is not None:
+            return facets
+    for name, value in cleaned_data.items():
+        if name != TAGS_FILTER:
+            queryset = filterset.filters[name].filter(queryset, value)
+    facets = count_facets(
+        queryset, cleaned_data.get(TAGS_FILTER), request.user
+    )
+    if anonymous:
+        facet_cache.set(key, facets)
+    return facets
@@ -0,0 +1,215 @@
+"""Быстрое чтение для списков API в обход полей DRF.
+
+Строки берутся через values()/values_list(), словари собираются заранее
+подготовленными функциями. Результат совпадает с выводом TagSerializer,
+IngredientSerializer и RecipeSerializer, это проверяет команда
+check_fast_serializers.
+"""
+from collections import defaultdict
+
+from recipes.models import Recipe, RecipeIngredient
+from rest_framework import serializers
+from users.models import Follow, MyUser
+
+from .fieldsets import FieldSet
+
+TAG_FIELDS = ("id", "name", "color", "slug")
+INGREDIENT_FIELDS = ("id", "name", "measurement_unit")
+RECIPE_INGREDIENT_FIELDS = ("id", "name", "measurement_unit", "amount")
+USER_FIELDS = ("email", "id", "username", "first_name", "last_name")
+
+RECIPE_VALUES = (
+    "id",
+    "author_id",
+    "name",
+    "image",
+    "text",
+    "cooking_time",
+    "pub_date",
+    "is_favorited",
+    "is_in_shopping_cart",
+)
+# Поля RecipeSerializer в порядке вывода и связи, которые без ?expand=
+# выводятся идентификаторами (api/fieldsets.py).
+RECIPE_FIELDS = (
+    "id",
+    "ingredients",
+    "tags",
+    "image",
+    "author",
+    "is_favorited",
+    "is_in_shopping_cart",
+    "name",
+    "text",
+    "cooking_time",
+    "pub_date",
+)
+RECIPE_RELATIONS = ("ingredients", "tags", "author")
+RECIPE_FIELD_VALUES = {
+    "ingredients": (),
+    "tags": (),
+    "author": ("author_id",),
+}
+
+pub_date_field = serializers.DateTimeField()
+image_storage = Recipe._meta.get_field("image").storage
+
+
+def serialize_rows(fields, rows):
+    """Словари из кортежей values_list в порядке полей сериализатора."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def serialize_tags(queryset):
+    return serialize_rows(TAG_FIELDS, queryset.values_list(*TAG_FIELDS))
+
+
+def serialize_ingredients(queryset):
+    return serialize_rows(
+        INGREDIENT_FIELDS, queryset.values_list(*INGREDIENT_FIELDS)
+    )
+
+
+def image_url(name, request):
+    """То же, что ImageField.to_representation для имени файла."""
+    if not name:
+        return None
+    url = image_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_recipe_tags(recipe_ids):
+    tags = defaultdict(list)
+    rows = (
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("tag__name")
+        .values_list(
+            "recipe_id", "tag_id", "tag__name", "tag__color", "tag__slug"
+        )
+    )
+    for recipe_id, *tag in rows:
+        tags[recipe_id].append(dict(zip(TAG_FIELDS, tag)))
+    return tags
+
+
+def get_recipe_ingredients(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        "recipe_id",
+        "ingredient_id",
+        "ingredient__name",
+        "ingredient__measurement_unit",
+        "amount",
+    )
+    for recipe_id, *ingredient in rows:
+        ingredients[recipe_id].append(
+            dict(zip(RECIPE_INGREDIENT_FIELDS, ingredient))
+        )
+    return ingredients
+
+
+def get_authors(author_ids, user):
+    subscribed = set()
+    if user.is_authenticated:
+        subscribed = set(
+            Follow.objects.filter(
+                user=user, author_id__in=author_ids
+            ).values_list("author_id", flat=True)
+        )
+    authors = {}
+    for row in MyUser.objects.filter(id__in=author_ids).values_list(
+        *USER_FIELDS
+    ):
+        author = dict(zip(USER_FIELDS, row))
+        author["is_subscribed"] = author["id"] in subscribed
+        authors[author["id"]] = author
+    return authors
+
+
+def get_recipe_tag_ids(recipe_ids):
+    tags = defaultdict(list)
+    rows = (
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("tag__name")
+        .values_list("recipe_id", "tag_id")
+    )
+    for recipe_id, tag_id in rows:
+        tags[recipe_id].append(tag_id)
+    return tags
+
+
+def get_recipe_ingredient_amounts(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list("recipe_id", "ingredient_id", "amount")
+    for recipe_id, ingredient_id, amount in rows:
+        ingredients[recipe_id].append({"id": ingredient_id, "amount": amount})
+    return ingredients
+
+
+def recipe_values(fieldset):
+    """Колонки values() для полей fieldset, id нужен всегда."""
+    values = ["id"]
+    for name in fieldset.fields:
+        for value in RECIPE_FIELD_VALUES.get(name, (name,)):
+            if value not in values:
+                values.append(value)
+    return values
+
+
+def serialize_recipes(rows, request, fieldset=None):
+    """Список рецептов как у RecipeSerializer, не больше четырёх запросов.
+
+    rows — словари queryset.values(*recipe_values(fieldset)) с аннотациями
+    is_favorited и is_in_shopping_cart из RecipeViewSet.get_queryset.
+    Связи, которых нет в fieldset, не запрашиваются.
+    """
+    rows = list(rows)
+    if fieldset is None:
+        fieldset = FieldSet(RECIPE_FIELDS)
+    recipe_ids = [row["id"] for row in rows]
+    related = {}
+    if fieldset.expanded("ingredients"):
+        related["ingredients"] = get_recipe_ingredients(recipe_ids)
+    elif "ingredients" in fieldset:
+        related["ingredients"] = get_recipe_ingredient_amounts(recipe_ids)
+    if fieldset.expanded("tags"):
+        related["tags"] = get_recipe_tags(recipe_ids)
+    elif "tags" in fieldset:
+        related["tags"] = get_recipe_tag_ids(recipe_ids)
+    authors = None
+    if fieldset.expanded("author"):
+        authors = get_authors(
+            {row["author_id"] for row in rows}, request.user
+        )
+
+    getters = []
+    for name in fieldset.fields:
+        if name in related:
+            values = related[name]
+            getters.append((name, lambda row, v=values: v[row["id"]]))
+        elif name == "author" and authors is not None:
+            getters.append((name, lambda row: authors[row["author_id"]]))
+        elif name == "author":
+            getters.append((name, lambda row: row["author_id"]))
+        elif name == "image":
+            getters.append(
+                (name, lambda row: image_url(row["image"], request))
+            )
+        elif name == "pub_date":
+            getters.append(
+                (
+                    name,
+                    lambda row: pub_date_field.to_representation(
+                        row["pub_date"]
+                    ),
+                )
+            )
+        else:
+            getters.append((name, lambda row, n=name: row[n]))
+    return [{name: get(row) for name, get in getters} for row in rows]
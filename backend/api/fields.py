@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from .metrics import IMAGE_DECODE_IN_PROGRESS
+
+
+class Base64ImageField(serializers.ImageField):
+    """Поле изображения в base64 с учётом декодируемых изображений.
+
+    Разбор base64 делегируется drf_extra_fields, который вместе с filetype
+    и Pillow импортируется только при первой загрузке изображения, а не
+    при запуске воркера.
+    """
+
+    _decoder = None
+
+    def to_internal_value(self, data):
+        if self._decoder is None:
+            from drf_extra_fields.fields import Base64ImageField as Decoder
+
+            self._decoder = Decoder()
+        with IMAGE_DECODE_IN_PROGRESS.track_inprogress():
+            return self._decoder.to_internal_value(data)
@@ -0,0 +1,80 @@
+"""Выборочные поля ответа: параметры ?fields= и ?expand=.
+
+fields — поля верхнего уровня через запятую, остальные поля не
+сериализуются и по возможности не читаются из базы. expand — связи,
+которые выводятся вложенными объектами. Без expand выводятся все связи,
+как раньше, а с ним остальные связи сокращаются до идентификаторов.
+"""
+from rest_framework import exceptions
+from rest_framework.serializers import ListSerializer
+
+
+class FieldSet:
+    """Поля ответа в порядке сериализатора и развёрнутые связи."""
+
+    __slots__ = ("fields", "expand")
+
+    def __init__(self, fields, expand=None):
+        self.fields = tuple(fields)
+        self.expand = expand
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def expanded(self, name):
+        return name in self.fields and (
+            self.expand is None or name in self.expand
+        )
+
+
+def split_param(request, name):
+    return [
+        value.strip()
+        for param in request.query_params.getlist(name)
+        for value in param.split(",")
+        if value.strip()
+    ]
+
+
+def parse_fieldset(request, fields, expandable=()):
+    """FieldSet из параметров запроса.
+
+    fields — все поля ответа в порядке вывода, expandable — связи,
+    у которых есть сокращённое представление.
+    """
+    errors = {}
+    selected = split_param(request, "fields")
+    unknown = set(selected).difference(fields)
+    if unknown:
+        errors["fields"] = [
+            f"Неизвестные поля: {', '.join(sorted(unknown))}"
+        ]
+    expand = None
+    if "expand" in request.query_params:
+        expand = set(split_param(request, "expand"))
+        unknown = expand.difference(expandable)
+        if unknown:
+            errors["expand"] = [
+                f"Нельзя развернуть: {', '.join(sorted(unknown))}"
+            ]
+    if errors:
+        raise exceptions.ValidationError(errors)
+    if selected:
+        fields = [name for name in fields if name in selected]
+    return FieldSet(fields, expand)
+
+
+def apply_fieldset(serializer, fieldset, compact_fields=None):
+    """Убирает из serializer поля вне fieldset и сокращает связи.
+
+    compact_fields — фабрики полей для нераскрытых связей.
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    fields = serializer.fields
+    for name in list(fields):
+        if name not in fieldset:
+            del fields[name]
+        elif compact_fields and name in compact_fields:
+            if not fieldset.expanded(name):
+                fields[name] = compact_fields[name]()
@@ -0,0 +1,25 @@
+"""Отдача закрытых файлов, которые не лежат в публичном /media/."""
+import os
+
+from django.http import FileResponse, HttpResponse
+
+
+def private_file_response(
+    path, root, accel_prefix, content_type, filename, inline=False
+):
+    """Ответ с файлом path из каталога root.
+
+    Если задан accel_prefix, Django отдаёт только заголовки, а файл
+    отправляет nginx из internal-location с этим префиксом
+    (X-Accel-Redirect). Без nginx файл читает сам Django.
+    """
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel_prefix + os.path.relpath(
+            path, root
+        ).replace(os.sep, "/")
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    disposition = "inline" if inline else "attachment"
+    response["Content-Disposition"] = f"{disposition}; filename={filename}"
+    return response
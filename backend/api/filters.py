@@ -1,6 +1,7 @@
 import django_filters
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.tag_mask import filter_by_tags
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -18,6 +19,7 @@ class RecipeFilter(FilterSet):
         field_name="tags__slug",
         to_field_name="slug",
         queryset=Tag.objects.all(),
+        method="tags_filter",
     )
     is_favorited = filters.BooleanFilter(method="is_favorited_filter")
     is_in_shopping_cart = filters.BooleanFilter(
@@ -33,14 +35,21 @@ class RecipeFilter(FilterSet):
             "is_in_shopping_cart",
         )
 
+    def tags_filter(self, queryset, name, data):
+        # Условие на маску тегов рецепта вместо JOIN с таблицей связей
+        # и DISTINCT.
+        if not data:
+            return queryset
+        return filter_by_tags(queryset, data)
+
     def is_favorited_filter(self, queryset, name, data):
         user = self.request.user
         if data and user.is_authenticated:
-            return queryset.filter(favoriting__user=user)
+            return queryset.filter(favorite__user=user)
         return queryset
 
     def is_in_shopping_cart_filter(self, queryset, name, data):
         user = self.request.user
         if data and user.is_authenticated:
-            return queryset.filter(shopping_cart__user=user)
+            return queryset.filter(cart__user=user)
         return queryset
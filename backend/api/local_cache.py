@@ -0,0 +1,247 @@
+"""Кеши каталога и кратких карточек рецептов в памяти воркера.
+
+Каждый воркер gunicorn держит свою копию, поэтому данные хранятся
+компактно: ингредиенты — по столбцам в array с общими (интернированными)
+единицами измерения, теги и рецепты — объектами с __slots__ вместо
+экземпляров моделей и словарей. Кеши ограничены по памяти и вытесняют
+давно не использованные записи.
+"""
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+from recipes.models import Ingredient, Recipe, Tag
+
+from .fast_serializers import INGREDIENT_FIELDS, TAG_FIELDS, image_url
+from .metrics import LOCAL_CACHE_BYTES, LOCAL_CACHE_ENTRIES, record_cache
+
+
+def deep_sizeof(obj, seen=None):
+    """Память объекта вместе со вложенными объектами, в байтах.
+
+    Общие объекты (например, интернированные строки) учитываются один раз.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            deep_sizeof(key, seen) + deep_sizeof(value, seen)
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+class IngredientColumns:
+    """Ингредиенты по столбцам в порядке сортировки базы."""
+
+    __slots__ = ("ids", "names", "unit_ids", "units")
+
+    def __init__(self, rows):
+        self.ids = array("q")
+        self.names = []
+        self.unit_ids = array("H")
+        self.units = []
+        positions = {}
+        for pk, name, unit in rows:
+            if unit not in positions:
+                positions[unit] = len(self.units)
+                self.units.append(sys.intern(unit))
+            self.ids.append(pk)
+            self.names.append(name)
+            self.unit_ids.append(positions[unit])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter(self, terms=()):
+        """Словари ингредиентов, названия которых начинаются с каждого из
+        terms без учёта регистра, как SearchFilter с полем ^name."""
+        terms = [term.lower() for term in terms]
+        return [
+            dict(zip(INGREDIENT_FIELDS, (pk, name, self.units[unit])))
+            for pk, name, unit in zip(self.ids, self.names, self.unit_ids)
+            if all(name.lower().startswith(term) for term in terms)
+        ]
+
+
+class TagRecord:
+    __slots__ = TAG_FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(TAG_FIELDS, values):
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in TAG_FIELDS}
+
+
+class RecipeSummary:
+    """Краткая карточка рецепта, как у ShortRecipeSerializer."""
+
+    __slots__ = ("id", "name", "image", "cooking_time")
+
+    def __init__(self, pk, name, image, cooking_time):
+        self.id = pk
+        self.name = name
+        self.image = image
+        self.cooking_time = cooking_time
+
+    def to_dict(self, request):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "image": image_url(self.image, request),
+            "cooking_time": self.cooking_time,
+        }
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кеш с ограничением по памяти и сроком жизни.
+
+    Размер каждой записи считается deep_sizeof при сохранении. Когда сумма
+    превышает max_bytes, вытесняются записи, к которым дольше всего
+    не обращались.
+    """
+
+    def __init__(self, name, max_bytes, ttl):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+        record_cache(self.name, entry is not None)
+        return None if entry is None else entry[0]
+
+    def set(self, key, value):
+        size = deep_sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+            self._report()
+
+    def get_or_set(self, key, load):
+        value = self.get(key)
+        if value is None:
+            value = load()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+                self._report()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self._report()
+
+    def _remove(self, key):
+        self.bytes -= self.entries.pop(key)[1]
+
+    def _report(self):
+        LOCAL_CACHE_BYTES.labels(self.name).set(self.bytes)
+        LOCAL_CACHE_ENTRIES.labels(self.name).set(len(self.entries))
+
+
+catalogue_cache = LRUCache(
+    "catalogue",
+    settings.LOCAL_CACHE_CATALOGUE_MAX_BYTES,
+    settings.LOCAL_CACHE_TTL,
+)
+recipe_cache = LRUCache(
+    "recipes",
+    settings.LOCAL_CACHE_RECIPES_MAX_BYTES,
+    settings.LOCAL_CACHE_TTL,
+)
+facet_cache = LRUCache(
+    "facets",
+    settings.LOCAL_CACHE_FACETS_MAX_BYTES,
+    settings.LOCAL_CACHE_FACETS_TTL,
+)
+
+
+def get_ingredients():
+    return catalogue_cache.get_or_set(
+        "ingredients",
+        lambda: IngredientColumns(
+            Ingredient.objects.values_list(*INGREDIENT_FIELDS)
+        ),
+    )
+
+
+def get_tags():
+    return catalogue_cache.get_or_set(
+        "tags",
+        lambda: tuple(
+            TagRecord(*row) for row in Tag.objects.values_list(*TAG_FIELDS)
+        ),
+    )
+
+
+def get_tag_bits():
+    """Пары (слаг, бит в маске тегов) всех тегов."""
+    return catalogue_cache.get_or_set(
+        "tag_bits", lambda: tuple(Tag.objects.values_list("slug", "bit"))
+    )
+
+
+def get_recipe_summaries(recipe_ids):
+    """Карточки рецептов в порядке recipe_ids, недостающие — одним
+    запросом."""
+    summaries = {}
+    missing = []
+    for pk in recipe_ids:
+        summary = recipe_cache.get(pk)
+        if summary is None:
+            missing.append(pk)
+        else:
+            summaries[pk] = summary
+    if missing:
+        for row in Recipe.objects.filter(id__in=missing).values_list(
+            "id", "name", "image", "cooking_time"
+        ):
+            summaries[row[0]] = RecipeSummary(*row)
+            recipe_cache.set(row[0], summaries[row[0]])
+    return [summaries[pk] for pk in recipe_ids if pk in summaries]
+
+
+def clear_catalogue(sender, **kwargs):
+    catalogue_cache.clear()
+
+
+def forget_recipe(sender, instance, **kwargs):
+    recipe_cache.delete(instance.pk)
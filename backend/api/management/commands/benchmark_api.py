@@ -0,0 +1,275 @@
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from users.models import MyUser
+
+
+# Сколько ингредиентов находит замеряемый поиск.
+SEARCH_LIMIT = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет число SQL-запросов и задержку для каждого эндпоинта API "
+        "на текущей базе данных"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--output",
+            default="benchmark-results.json",
+            help="Файл для сохранения результатов",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Файл с предыдущими результатами для сравнения",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="*",
+            help="Замерить только эндпоинты с указанными именами",
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            MyUser.objects.annotate(favorites=Count("favorite"))
+            .order_by("-favorites", "id")
+            .first()
+        )
+        recipe = Recipe.objects.order_by("-pub_date").first()
+        if user is None or recipe is None:
+            raise CommandError(
+                "В базе нет данных, сначала выполните generate_data"
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        anonymous = APIClient(
+            raise_request_exception=False, HTTP_HOST="localhost"
+        )
+        client = APIClient(
+            raise_request_exception=False, HTTP_HOST="localhost"
+        )
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        endpoints = self.get_endpoints(user, recipe, anonymous, client)
+        if options["only"]:
+            endpoints = [
+                item for item in endpoints if item[0] in options["only"]
+            ]
+        results = {}
+        for name, api_client, url in endpoints:
+            results[name] = self.measure(
+                api_client, url, options["iterations"], options["warmup"]
+            )
+            self.stdout.write(self.format_row(name, results[name]))
+        self.check_search(results)
+
+        report = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "database": connection.vendor,
+                "iterations": options["iterations"],
+                "users": MyUser.objects.count(),
+                "recipes": Recipe.objects.count(),
+                "ingredients": Ingredient.objects.count(),
+            },
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Результаты сохранены в {options['output']}")
+        )
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def search_prefix(self, name, limit=SEARCH_LIMIT):
+        """Самый короткий префикс первого слова name, по которому
+        находится не больше limit ингредиентов, — как ввод в поле
+        автодополнения. SearchFilter делит запрос на слова, поэтому
+        префикс не длиннее первого слова."""
+        word = name.replace(",", " ").split()[0]
+        for length in range(2, len(word)):
+            prefix = word[:length]
+            if (
+                Ingredient.objects.filter(name__istartswith=prefix).count()
+                <= limit
+            ):
+                return prefix
+        if Ingredient.objects.filter(name__istartswith=word).count() > limit:
+            self.stderr.write(
+                f"Поиск «{word}» находит больше {limit} ингредиентов, "
+                "замер поиска близок к полному списку"
+            )
+        return word
+
+    def check_search(self, results):
+        """Предупреждает, если поиск ингредиентов отдал не меньше
+        полного списка: такой замер относится к полному списку."""
+        search = results.get("ingredients-search")
+        full = results.get("ingredients-list")
+        if search and full and search["bytes"] >= full["bytes"]:
+            self.stderr.write(
+                self.style.WARNING(
+                    "Поиск ингредиентов вернул полный список: "
+                    f"{search['url']} не фильтрует ответ"
+                )
+            )
+
+    def get_endpoints(self, user, recipe, anonymous, client):
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        recipes_url = reverse("api:recipes-list")
+        endpoints = [
+            ("users-list", client, reverse("api:users-list")),
+            (
+                "users-detail",
+                client,
+                reverse("api:users-detail", args=[recipe.author_id]),
+            ),
+            ("users-me", client, reverse("api:users-me")),
+            (
+                "users-subscriptions",
+                client,
+                reverse("api:users-subscriptions"),
+            ),
+            ("tags-list", anonymous, reverse("api:tags-list")),
+            ("ingredients-list", anonymous, reverse("api:ingredients-list")),
+            ("recipes-list-anonymous", anonymous, recipes_url),
+            ("recipes-list", client, recipes_url),
+            (
+                "recipes-list-favorited",
+                client,
+                recipes_url + "?is_favorited=1",
+            ),
+            (
+                "recipes-list-in-cart",
+                client,
+                recipes_url + "?is_in_shopping_cart=1",
+            ),
+            (
+                "recipes-list-author",
+                client,
+                recipes_url + f"?author={recipe.author_id}",
+            ),
+            (
+                "recipes-list-trending",
+                anonymous,
+                recipes_url + "?ordering=trending",
+            ),
+            (
+                "recipes-detail",
+                client,
+                reverse("api:recipes-detail", args=[recipe.id]),
+            ),
+            (
+                "recipes-similar",
+                anonymous,
+                reverse("api:recipes-similar", args=[recipe.id]),
+            ),
+            (
+                "recipes-download-shopping-cart",
+                client,
+                reverse("api:recipes-download_shopping_cart"),
+            ),
+        ]
+        if tag is not None:
+            endpoints += [
+                (
+                    "tags-detail",
+                    anonymous,
+                    reverse("api:tags-detail", args=[tag.id]),
+                ),
+                (
+                    "recipes-list-tags",
+                    anonymous,
+                    recipes_url + f"?tags={tag.slug}",
+                ),
+            ]
+        if ingredient is not None:
+            endpoints += [
+                (
+                    "ingredients-detail",
+                    anonymous,
+                    reverse("api:ingredients-detail", args=[ingredient.id]),
+                ),
+                (
+                    "ingredients-search",
+                    anonymous,
+                    reverse("api:ingredients-list")
+                    + "?"
+                    + urlencode(
+                        {
+                            api_settings.SEARCH_PARAM: self.search_prefix(
+                                ingredient.name
+                            )
+                        }
+                    ),
+                ),
+            ]
+        return endpoints
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        query_count = len(queries)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return {
+            "url": url,
+            "status": response.status_code,
+            "queries": query_count,
+            "bytes": len(response.content),
+            "mean_ms": round(statistics.mean(timings), 2),
+            "p50_ms": round(timings[len(timings) // 2], 2),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+            "max_ms": round(timings[-1], 2),
+        }
+
+    def format_row(self, name, result):
+        return (
+            f"{name:<34} {result['status']:>3} "
+            f"{result['queries']:>5} запр. "
+            f"p50 {result['p50_ms']:>8.2f} мс "
+            f"p95 {result['p95_ms']:>8.2f} мс "
+            f"{result['bytes']:>8} байт"
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+        self.stdout.write("\nСравнение с " + path)
+        for name, result in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{name:<34} "
+                f"запросы {before['queries']:>5} -> {result['queries']:<5} "
+                f"p50 {before['p50_ms']:>8.2f} -> {result['p50_ms']:<8.2f} мс "
+                f"({self.change(before['p50_ms'], result['p50_ms'])})"
+            )
+
+    def change(self, before, after):
+        if not before:
+            return "н/д"
+        return f"{(after - before) / before * 100:+.1f}%"
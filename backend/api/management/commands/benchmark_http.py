@@ -0,0 +1,108 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    "/api/tags/",
+    "/api/ingredients/",
+    "/api/recipes/download_shopping_cart/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет пропускную способность запущенного сервера при "
+        "параллельных запросах, например для сравнения WSGI и ASGI"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--paths", nargs="*", default=DEFAULT_PATHS)
+        parser.add_argument("--token", help="Токен для Authorization")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="Файл для сохранения")
+        parser.add_argument("--compare", help="Файл прошлого прогона")
+
+    def handle(self, *args, **options):
+        headers = {"Host": "localhost"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        results = {}
+        for path in options["paths"]:
+            results[path] = self.measure(
+                options["url"] + path,
+                headers,
+                options["concurrency"],
+                options["requests"],
+                options["timeout"],
+            )
+            self.stdout.write(self.format_row(path, results[path]))
+        if options["output"]:
+            report = {
+                "concurrency": options["concurrency"],
+                "results": results,
+            }
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def fetch(self, url, headers, timeout):
+        start = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers), timeout=timeout) as r:
+                r.read()
+                status = r.status
+        except HTTPError as error:
+            status = error.code
+        except OSError:
+            status = 0
+        return status, (time.perf_counter() - start) * 1000
+
+    def measure(self, url, headers, concurrency, total, timeout):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            responses = list(
+                pool.map(
+                    lambda _: self.fetch(url, headers, timeout), range(total)
+                )
+            )
+        elapsed = time.perf_counter() - start
+        timings = sorted(duration for _, duration in responses)
+        errors = sum(1 for status, _ in responses if status != 200)
+        return {
+            "requests": total,
+            "errors": errors,
+            "rps": round(total / elapsed, 1),
+            "p50_ms": round(timings[len(timings) // 2], 2),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+            "max_ms": round(timings[-1], 2),
+        }
+
+    def format_row(self, path, result):
+        return (
+            f"{path:<40} {result['rps']:>8.1f} запр./с "
+            f"p50 {result['p50_ms']:>8.2f} мс "
+            f"p95 {result['p95_ms']:>8.2f} мс "
+            f"ошибок {result['errors']}"
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+        self.stdout.write("\nСравнение с " + path)
+        for name, result in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{name:<40} {before['rps']:>8.1f} -> {result['rps']:<8.1f} "
+                f"запр./с, p95 {before['p95_ms']:.2f} -> "
+                f"{result['p95_ms']:.2f} мс"
+            )
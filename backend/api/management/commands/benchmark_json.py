@@ -0,0 +1,83 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer, orjson
+from api.serializers import IngredientSerializer, RecipeSerializer
+from api.views import RecipeViewSet
+
+
+def median_time(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает JSONRenderer/JSONParser DRF с вариантами на orjson "
+        "на реальных данных сериализаторов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson не установлен")
+        payloads = {
+            "recipes": self.recipes_page(options["page_size"]),
+            "ingredients": IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+        }
+        for name, data in payloads.items():
+            self.compare(name, data, options["iterations"])
+
+    def recipes_page(self, page_size):
+        request = Request(
+            APIRequestFactory().get("/api/recipes/", HTTP_HOST="localhost")
+        )
+        view = RecipeViewSet(
+            request=request, action="list", format_kwarg=None, kwargs={}
+        )
+        return RecipeSerializer(
+            view.get_queryset()[:page_size],
+            many=True,
+            context=view.get_serializer_context(),
+        ).data
+
+    def compare(self, name, data, iterations):
+        stdlib, fast = JSONRenderer(), ORJSONRenderer()
+        content = stdlib.render(data)
+        if fast.render(data) != content:
+            raise CommandError(f"{name}: ответы рендереров различаются")
+        render_before = median_time(lambda: stdlib.render(data), iterations)
+        render_after = median_time(lambda: fast.render(data), iterations)
+        parse_before = median_time(
+            lambda: JSONParser().parse(io.BytesIO(content)), iterations
+        )
+        parse_after = median_time(
+            lambda: ORJSONParser().parse(io.BytesIO(content)), iterations
+        )
+        self.stdout.write(
+            f"{name:<12} {len(content):>9} байт  "
+            f"рендеринг {render_before * 1000:>7.3f} -> "
+            f"{render_after * 1000:.3f} мс "
+            f"(x{render_before / render_after:.1f})  "
+            f"разбор {parse_before * 1000:>7.3f} -> "
+            f"{parse_after * 1000:.3f} мс "
+            f"(x{parse_before / parse_after:.1f})"
+        )
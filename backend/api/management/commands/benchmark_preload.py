@@ -0,0 +1,146 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MEMORY_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Private_Clean": "uss",
+    "Private_Dirty": "uss",
+}
+
+
+def read_memory(pid):
+    """RSS, PSS и USS процесса в килобайтах из /proc/<pid>/smaps_rollup."""
+    memory = {"rss": 0, "pss": 0, "uss": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in MEMORY_FIELDS:
+                memory[MEMORY_FIELDS[name]] += int(value.split()[0])
+    return memory
+
+
+def child_pids(parent):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                stat = file.read()
+        except OSError:
+            continue
+        if int(stat.rsplit(")", 1)[1].split()[1]) == parent:
+            pids.append(int(entry))
+    return pids
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает память gunicorn с предзагрузкой приложения в мастере "
+        "и без неё (только Linux)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument("--path", default="/api/tags/")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Запросов для прогрева воркеров перед замером",
+        )
+        parser.add_argument("--settle", type=float, default=2.0)
+        parser.add_argument("--timeout", type=float, default=60)
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("Нужен Linux с /proc/<pid>/smaps_rollup")
+        results = {}
+        for preload in (False, True):
+            results[preload] = self.measure(preload, options)
+            self.stdout.write(self.format_row(preload, results[preload]))
+        saved = results[False]["pss"] - results[True]["pss"]
+        self.stdout.write(
+            f"\nЭкономия PSS с предзагрузкой: {saved / 1024:.1f} МБ "
+            f"({saved / results[False]['pss']:.0%})"
+        )
+
+    def measure(self, preload, options):
+        url = f"http://127.0.0.1:{options['port']}{options['path']}"
+        env = dict(
+            os.environ,
+            GUNICORN_PRELOAD=str(preload),
+            GUNICORN_WORKERS=str(options["workers"]),
+            GUNICORN_BIND=f"127.0.0.1:{options['port']}",
+            GUNICORN_ACCESSLOG="",
+            # Отдельный каталог, чтобы on_starting не стёр метрики
+            # работающего сервера.
+            PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(),
+        )
+        start = time.perf_counter()
+        master = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_ready(master, url, options)
+            boot = time.perf_counter() - start
+            for _ in range(options["requests"]):
+                self.fetch(url)
+            time.sleep(options["settle"])
+            pids = [master.pid] + child_pids(master.pid)
+            total = {"rss": 0, "pss": 0, "uss": 0}
+            for pid in pids:
+                for name, value in read_memory(pid).items():
+                    total[name] += value
+            total["boot_s"] = round(boot, 2)
+            return total
+        finally:
+            master.send_signal(signal.SIGTERM)
+            master.wait(timeout=options["timeout"])
+
+    def wait_ready(self, master, url, options):
+        deadline = time.monotonic() + options["timeout"]
+        while time.monotonic() < deadline:
+            if master.poll() is not None:
+                raise CommandError("gunicorn завершился при запуске")
+            if (
+                len(child_pids(master.pid)) >= options["workers"]
+                and self.fetch(url)
+            ):
+                return
+            time.sleep(0.2)
+        raise CommandError("gunicorn не запустился за отведённое время")
+
+    def fetch(self, url):
+        try:
+            with urlopen(Request(url, headers={"Host": "localhost"})) as r:
+                r.read()
+        except HTTPError:
+            pass
+        except OSError:
+            return False
+        return True
+
+    def format_row(self, preload, result):
+        mode = "с предзагрузкой" if preload else "без предзагрузки"
+        return (
+            f"{mode:<18} RSS {result['rss'] / 1024:>8.1f} МБ "
+            f"PSS {result['pss'] / 1024:>8.1f} МБ "
+            f"USS {result['uss'] / 1024:>8.1f} МБ "
+            f"запуск {result['boot_s']:.2f} с"
+        )
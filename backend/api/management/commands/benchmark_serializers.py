@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Prefetch
+from recipes.models import Ingredient, RecipeIngredient, Tag
+from users.models import MyUser
+
+from api.fast_serializers import (
+    serialize_ingredients,
+    serialize_recipes,
+    serialize_tags,
+)
+from api.serializers import (
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+from api.views import RecipeViewSet
+
+from .check_fast_serializers import make_view, recipe_querysets
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность сериализаторов DRF и "
+        "api.fast_serializers в объектах в секунду (вместе с SQL)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--iterations", type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = (
+            MyUser.objects.annotate(favorites=Count("favorite"))
+            .order_by("-favorites", "id")
+            .first()
+        )
+        view = make_view(RecipeViewSet, "/api/recipes/", user)
+        context = view.get_serializer_context()
+        objects, rows = recipe_querysets(view, options["recipes"])
+        # DRF получает лучшие для себя условия: все связи предзагружены,
+        # остаётся только запрос is_subscribed на каждый рецепт.
+        objects = objects.select_related("author").prefetch_related(
+            "tags",
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+        cases = (
+            (
+                "tags",
+                lambda: TagSerializer(Tag.objects.all(), many=True).data,
+                lambda: serialize_tags(Tag.objects.all()),
+            ),
+            (
+                "ingredients",
+                lambda: IngredientSerializer(
+                    Ingredient.objects.all(), many=True
+                ).data,
+                lambda: serialize_ingredients(Ingredient.objects.all()),
+            ),
+            (
+                "recipes",
+                lambda: RecipeSerializer(
+                    objects.all(), many=True, context=context
+                ).data,
+                lambda: serialize_recipes(rows.all(), view.request),
+            ),
+        )
+        for name, drf, fast in cases:
+            count = len(fast())
+            before = self.measure(drf, options["iterations"])
+            after = self.measure(fast, options["iterations"])
+            self.stdout.write(
+                f"{name:<12} {count:>6} объектов  "
+                f"DRF {count / before:>10.0f} об./с  "
+                f"быстрый {count / after:>10.0f} об./с  "
+                f"(x{before / after:.1f})"
+            )
+
+    def measure(self, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,83 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# То же, что делает воркер gunicorn до первого ответа: загрузка
+# WSGI-приложения с middleware и разбор корневого URLconf.
+STARTUP_CODE = (
+    "from django.core.wsgi import get_wsgi_application\n"
+    "get_wsgi_application()\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def parse_importtime(output):
+    """Суммарное время импорта и собственное время по пакетам, мкс."""
+    total = 0
+    packages = Counter()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            total += int(cumulative)
+        packages[name.strip().split(".")[0]] += int(own)
+    return total, packages
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время холодного запуска приложения с разными профилями "
+        "настроек по данным python -X importtime"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="*",
+            default=("foodgram.settings", "foodgram.settings_api"),
+            help="Модули настроек для сравнения",
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"]:
+            wall, imports, packages = self.measure(profile, options["runs"])
+            self.stdout.write(
+                f"{profile:<30} запуск {wall * 1000:>8.1f} мс, "
+                f"импорт {imports / 1000:>8.1f} мс"
+            )
+            for name, own in packages.most_common(options["top"]):
+                self.stdout.write(f"    {name:<28} {own / 1000:>8.1f} мс")
+
+    def measure(self, profile, runs):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        walls = []
+        imports = []
+        packages = Counter()
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            walls.append(time.perf_counter() - start)
+            if process.returncode:
+                raise CommandError(process.stderr.splitlines()[-1])
+            total, run_packages = parse_importtime(process.stderr)
+            imports.append(total)
+            packages.update(run_packages)
+        for name in packages:
+            packages[name] //= runs
+        return statistics.median(walls), statistics.median(imports), packages
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalogue import CatalogueSnapshot, build_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает снимок каталога тегов и ингредиентов, например после "
+        "массовой загрузки данных без сигналов"
+    )
+
+    def handle(self, *args, **options):
+        path = settings.CATALOGUE_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("CATALOGUE_SNAPSHOT_PATH не задан")
+        build_snapshot(path)
+        snapshot = CatalogueSnapshot(path)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{path}: {snapshot.ingredient_count} ингредиентов, "
+                f"{snapshot.tag_count} тегов, {snapshot.size} байт"
+            )
+        )
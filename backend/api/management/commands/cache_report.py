@@ -0,0 +1,117 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import CollectorRegistry, multiprocess
+from recipes.models import Ingredient, Recipe, Tag
+
+from api.catalogue import get_snapshot
+from api.fast_serializers import INGREDIENT_FIELDS, TAG_FIELDS
+from api.local_cache import (
+    IngredientColumns,
+    RecipeSummary,
+    TagRecord,
+    deep_sizeof,
+)
+
+CACHE_METRICS = {
+    "foodgram_local_cache_bytes": "bytes",
+    "foodgram_local_cache_entries": "entries",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает память кешей api.local_cache в каждом воркере и "
+        "сравнивает компактное хранение с моделями и словарями"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=1000,
+            help="Сколько карточек рецептов взять для оценки",
+        )
+
+    def handle(self, *args, **options):
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            self.report_workers()
+        else:
+            self.stdout.write(
+                "PROMETHEUS_MULTIPROC_DIR не задана, данные воркеров "
+                "недоступны\n"
+            )
+        if settings.CATALOGUE_SNAPSHOT_PATH:
+            snapshot = get_snapshot()
+            self.stdout.write(
+                f"Снимок каталога {settings.CATALOGUE_SNAPSHOT_PATH}: "
+                f"{snapshot.size / 1024:.1f} КБ общей памяти на все "
+                f"воркеры ({snapshot.ingredient_count} ингредиентов, "
+                f"{snapshot.tag_count} тегов)\n"
+            )
+        self.report_estimate(options["recipes"])
+
+    def report_workers(self):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        workers = {}
+        for metric in registry.collect():
+            for sample in metric.samples:
+                if sample.name not in CACHE_METRICS:
+                    continue
+                key = (sample.labels["pid"], sample.labels["cache"])
+                workers.setdefault(key, {})[
+                    CACHE_METRICS[sample.name]
+                ] = int(sample.value)
+        self.stdout.write("Кеши воркеров:")
+        for (pid, cache), values in sorted(workers.items()):
+            self.stdout.write(
+                f"  pid {pid:>7} {cache:<10} "
+                f"{values.get('entries', 0):>8} записей "
+                f"{values.get('bytes', 0) / 1024:>10.1f} КБ"
+            )
+        self.stdout.write("")
+
+    def report_estimate(self, recipe_count):
+        ingredient_rows = list(
+            Ingredient.objects.values_list(*INGREDIENT_FIELDS)
+        )
+        tag_rows = list(Tag.objects.values_list(*TAG_FIELDS))
+        recipe_fields = ("id", "name", "image", "cooking_time")
+        recipe_rows = list(
+            Recipe.objects.values_list(*recipe_fields)[:recipe_count]
+        )
+        cases = (
+            (
+                f"ингредиенты ({len(ingredient_rows)})",
+                list(Ingredient.objects.all()),
+                [dict(zip(INGREDIENT_FIELDS, row)) for row in ingredient_rows],
+                IngredientColumns(ingredient_rows),
+            ),
+            (
+                f"теги ({len(tag_rows)})",
+                list(Tag.objects.all()),
+                [dict(zip(TAG_FIELDS, row)) for row in tag_rows],
+                tuple(TagRecord(*row) for row in tag_rows),
+            ),
+            (
+                f"рецепты ({len(recipe_rows)})",
+                list(Recipe.objects.only(*recipe_fields)[:recipe_count]),
+                [dict(zip(recipe_fields, row)) for row in recipe_rows],
+                [RecipeSummary(*row) for row in recipe_rows],
+            ),
+        )
+        self.stdout.write("Оценка памяти на один воркер:")
+        for name, models, dicts, compact in cases:
+            models, dicts, compact = (
+                deep_sizeof(models),
+                deep_sizeof(dicts),
+                deep_sizeof(compact),
+            )
+            self.stdout.write(
+                f"  {name:<22} модели {models / 1024:>9.1f} КБ  "
+                f"словари {dicts / 1024:>9.1f} КБ  "
+                f"компактно {compact / 1024:>9.1f} КБ "
+                f"(x{models / max(compact, 1):.1f} меньше моделей)"
+            )
@@ -0,0 +1,180 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from recipes.models import Recipe, Tag
+from rest_framework.filters import SearchFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import MyUser
+
+from api.catalogue import build_snapshot, get_snapshot
+from api.fast_serializers import (
+    recipe_values,
+    serialize_ingredients,
+    serialize_recipes,
+    serialize_tags,
+)
+from api.fieldsets import apply_fieldset
+from api.local_cache import (
+    catalogue_cache,
+    get_ingredients,
+    get_recipe_summaries,
+    get_tags,
+)
+from api.serializers import (
+    IngredientSerializer,
+    RecipeSerializer,
+    ShortRecipeSerializer,
+    TagSerializer,
+)
+from api.views import IngredientViewSet, RecipeViewSet
+
+RECIPE_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?is_favorited=1",
+    "/api/recipes/?is_in_shopping_cart=1",
+    "/api/recipes/?tags=breakfast&tags=dinner",
+    "/api/recipes/?ordering=trending",
+    "/api/recipes/?fields=id,name,image,cooking_time",
+    "/api/recipes/?fields=id,author,tags,ingredients&expand=author",
+    "/api/recipes/?expand=",
+)
+
+
+def make_view(view_class, path, user=None, action="list"):
+    """Экземпляр представления с запросом, как при обработке path."""
+    request = Request(
+        APIRequestFactory().get(path, HTTP_HOST="localhost")
+    )
+    if user is not None:
+        request.user = user
+    return view_class(
+        request=request, action=action, format_kwarg=None, kwargs={}
+    )
+
+
+def recipe_querysets(view, limit):
+    """Одна и та же выборка рецептов для DRF и для быстрого пути."""
+    queryset = view.filter_queryset(view.get_queryset())
+    return (
+        queryset[:limit],
+        queryset.values(*recipe_values(view.fieldset))[:limit],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет, что api.fast_serializers, api.local_cache и снимок "
+        "каталога выдают тот же JSON, что и сериализаторы DRF"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=3,
+            help="Сколько самых активных пользователей проверить",
+        )
+        parser.add_argument("--limit", type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.renderer = JSONRenderer()
+        self.failures = 0
+        self.compare(
+            "tags",
+            TagSerializer(Tag.objects.all(), many=True).data,
+            serialize_tags(Tag.objects.all()),
+        )
+        catalogue_cache.clear()
+        self.compare(
+            "tags (кеш)",
+            TagSerializer(Tag.objects.all(), many=True).data,
+            [tag.to_dict() for tag in get_tags()],
+        )
+        if settings.CATALOGUE_SNAPSHOT_PATH:
+            build_snapshot()
+            self.compare(
+                "tags (снимок)",
+                TagSerializer(Tag.objects.all(), many=True).data,
+                get_snapshot().tags(),
+            )
+        for path in ("/api/ingredients/", "/api/ingredients/?name=ин"):
+            view = make_view(IngredientViewSet, path)
+            queryset = view.filter_queryset(view.get_queryset())
+            expected = IngredientSerializer(queryset, many=True).data
+            self.compare(path, expected, serialize_ingredients(queryset))
+            self.compare(
+                f"{path} (кеш)",
+                expected,
+                get_ingredients().filter(
+                    SearchFilter().get_search_terms(view.request)
+                ),
+            )
+            if settings.CATALOGUE_SNAPSHOT_PATH:
+                self.compare(
+                    f"{path} (снимок)",
+                    expected,
+                    get_snapshot().ingredients(
+                        SearchFilter().get_search_terms(view.request)
+                    ),
+                )
+        view = make_view(RecipeViewSet, "/api/recipes/")
+        recipe_ids = list(
+            Recipe.objects.values_list("id", flat=True)[: options["limit"]]
+        )
+        self.compare(
+            "recipe summaries (кеш)",
+            ShortRecipeSerializer(
+                Recipe.objects.filter(id__in=recipe_ids).order_by("id"),
+                many=True,
+                context=view.get_serializer_context(),
+            ).data,
+            [
+                summary.to_dict(view.request)
+                for summary in get_recipe_summaries(sorted(recipe_ids))
+            ],
+        )
+        users = [None] + list(
+            MyUser.objects.annotate(favorites=Count("favorite"))
+            .order_by("-favorites", "id")[: options["users"]]
+        )
+        for user in users:
+            for path in RECIPE_PATHS:
+                view = make_view(RecipeViewSet, path, user)
+                objects, rows = recipe_querysets(view, options["limit"])
+                serializer = RecipeSerializer(
+                    objects, many=True, context=view.get_serializer_context()
+                )
+                apply_fieldset(
+                    serializer, view.fieldset, RecipeSerializer.compact_fields
+                )
+                self.compare(
+                    f"{path} ({user or 'аноним'})",
+                    serializer.data,
+                    serialize_recipes(rows, view.request, view.fieldset),
+                )
+        if self.failures:
+            raise CommandError(f"Расхождений: {self.failures}")
+        self.stdout.write(self.style.SUCCESS("Вывод совпадает"))
+
+    def compare(self, name, expected, actual):
+        expected = self.renderer.render(expected)
+        actual = self.renderer.render(actual)
+        if expected == actual:
+            self.stdout.write(f"OK    {name}")
+            return
+        self.failures += 1
+        position = next(
+            (
+                index
+                for index, (left, right) in enumerate(zip(expected, actual))
+                if left != right
+            ),
+            min(len(expected), len(actual)),
+        )
+        self.stdout.write(
+            self.style.ERROR(f"FAIL  {name}: различие с байта {position}")
+        )
+        self.stdout.write(f"      DRF:     {expected[position:][:120]}")
+        self.stdout.write(f"      быстрый: {actual[position:][:120]}")
@@ -0,0 +1,183 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShopingList,
+    SimilarRecipe,
+)
+from recipes.shopping_list import shopping_list_queryset
+from users.models import Follow, MyUser
+
+from api.fast_serializers import RECIPE_VALUES
+from api.views import IngredientViewSet, RecipeViewSet
+
+from .check_fast_serializers import make_view
+
+# Таблицы, которые растут вместе с числом пользователей и рецептов.
+# Полный просмотр справочников (теги) допустим.
+LARGE_TABLES = (
+    "recipes_recipe",
+    "recipes_ingredient",
+    "recipes_recipeingredient",
+    "recipes_recipe_tags",
+    "recipes_favorite",
+    "recipes_shopinglist",
+    "recipes_similarrecipe",
+    "users_follow",
+    "users_myuser",
+)
+
+# Строки плана с полным просмотром таблицы: PostgreSQL и SQLite.
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"SCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)"),
+}
+
+PAGE_SIZE = 6
+
+
+def recipe_list(path, user=None):
+    view = make_view(RecipeViewSet, path, user)
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset.values(*RECIPE_VALUES)[:PAGE_SIZE]
+
+
+def ingredient_search(term):
+    view = make_view(IngredientViewSet, f"/api/ingredients/?search={term}")
+    return view.filter_queryset(view.get_queryset())
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет EXPLAIN частых запросов API и падает, если запрос "
+        "просматривает большую таблицу целиком. Запускайте на базе "
+        "с большим объёмом данных (generate_data), иначе планировщик "
+        "вправе выбрать полный просмотр маленьких таблиц"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Обновить статистику планировщика перед проверкой",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Печатать планы всех запросов",
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f"Планы запросов {connection.vendor} не поддерживаются"
+            )
+        if options["analyze"]:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        user = (
+            MyUser.objects.annotate(favorites=Count("favorite"))
+            .order_by("-favorites")
+            .first()
+        )
+        if user is None:
+            raise CommandError("Нет данных, сначала запустите generate_data")
+        author_id = (
+            Recipe.objects.order_by("-pub_date")
+            .values_list("author_id", flat=True)
+            .first()
+        )
+        recipe_ids = list(
+            Recipe.objects.values_list("id", flat=True)[:PAGE_SIZE]
+        )
+        queries = [
+            ("рецепты", recipe_list("/api/recipes/")),
+            ("рецепты пользователя", recipe_list("/api/recipes/", user)),
+            (
+                "рецепты автора",
+                recipe_list(f"/api/recipes/?author={author_id}"),
+            ),
+            (
+                "избранное",
+                recipe_list("/api/recipes/?is_favorited=1", user),
+            ),
+            (
+                "список покупок",
+                recipe_list("/api/recipes/?is_in_shopping_cart=1", user),
+            ),
+            (
+                "рецепты по тегам",
+                recipe_list("/api/recipes/?tags=breakfast&tags=dinner"),
+            ),
+            (
+                "популярные рецепты",
+                recipe_list("/api/recipes/?ordering=trending"),
+            ),
+            (
+                "ингредиенты рецептов",
+                RecipeIngredient.objects.filter(recipe_id__in=recipe_ids),
+            ),
+            (
+                "теги рецептов",
+                Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids),
+            ),
+            (
+                "похожие рецепты",
+                SimilarRecipe.objects.filter(recipe_id=recipe_ids[0]),
+            ),
+            (
+                "подписки",
+                MyUser.objects.filter(following__user=user)[:PAGE_SIZE],
+            ),
+            ("подписчики автора", Follow.objects.filter(author_id=author_id)),
+            (
+                "рецепты в подписках",
+                Recipe.objects.filter(author_id=author_id)[:3],
+            ),
+            ("выгрузка списка покупок", shopping_list_queryset(user)),
+            (
+                "избранное для рейтинга",
+                Favorite.objects.filter(
+                    date_added__gte=timezone.now() - timedelta(days=7)
+                ),
+            ),
+            (
+                "покупки для рейтинга",
+                ShopingList.objects.filter(
+                    date_add__gte=timezone.now() - timedelta(days=7)
+                ),
+            ),
+        ]
+        if connection.vendor == "postgresql":
+            # В SQLite LIKE не использует индексы при регистронезависимом
+            # сравнении, индекс по UPPER(name) рассчитан на PostgreSQL.
+            queries.append(("поиск ингредиентов", ingredient_search("со")))
+
+        failures = 0
+        for label, queryset in queries:
+            plan = queryset.explain()
+            scanned = sorted(
+                set(pattern.findall(plan)).intersection(LARGE_TABLES)
+            )
+            if options["verbose_plans"] or scanned:
+                self.stdout.write(f"{label}:\n{plan}\n")
+            if scanned:
+                failures += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{label}: полный просмотр {', '.join(scanned)}"
+                    )
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{label}: OK"))
+        if failures:
+            raise CommandError(f"Запросов с полным просмотром: {failures}")
@@ -0,0 +1,88 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    "foodgram_request_duration_seconds",
+    "Время обработки запроса",
+    ["view"],
+)
+DB_QUERIES = Histogram(
+    "foodgram_db_queries_per_request",
+    "Количество SQL-запросов на один запрос к API",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_DURATION = Histogram(
+    "foodgram_db_duration_seconds",
+    "Суммарное время SQL-запросов на один запрос к API",
+    ["view"],
+)
+CACHE_REQUESTS = Counter(
+    "foodgram_cache_requests_total",
+    "Обращения к кешам приложения",
+    ["cache", "result"],
+)
+LOCAL_CACHE_BYTES = Gauge(
+    "foodgram_local_cache_bytes",
+    "Память, занятая кешем в процессе воркера",
+    ["cache"],
+    multiprocess_mode="liveall",
+)
+LOCAL_CACHE_ENTRIES = Gauge(
+    "foodgram_local_cache_entries",
+    "Число записей в кеше процесса воркера",
+    ["cache"],
+    multiprocess_mode="liveall",
+)
+SHOPPING_LIST_EXPORT_BYTES = Histogram(
+    "foodgram_shopping_list_export_bytes",
+    "Размер выгруженного списка покупок",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+SHOPPING_LIST_EXPORT_DURATION = Histogram(
+    "foodgram_shopping_list_export_duration_seconds",
+    "Время формирования списка покупок",
+)
+IMAGE_DECODE_IN_PROGRESS = Gauge(
+    "foodgram_image_decode_in_progress",
+    "Изображения, которые сейчас декодируются из base64 "
+    "(без сохранения файла)",
+    multiprocess_mode="livesum",
+)
+
+
+def record_cache(cache, hit):
+    """Учитывает попадание или промах кеша cache."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def get_registry():
+    """Реестр метрик с учётом многопроцессного режима gunicorn.
+
+    При заданной PROMETHEUS_MULTIPROC_DIR каждый воркер пишет значения в
+    свои файлы в этом каталоге, а при сборе они суммируются по всем
+    воркерам.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Отдаёт метрики в формате Prometheus."""
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,358 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from foodgram.routers import Route, choose_replica, current_route
+
+from .metrics import DB_DURATION, DB_QUERIES, REQUEST_LATENCY
+
+logger = logging.getLogger("api.instrumentation")
+
+IN_CLAUSE_RE = re.compile(r"IN \((?:%s, )*%s\)")
+NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+def sql_shape(sql):
+    """Приводит SQL к форме без конкретных значений.
+
+    Списки IN (%s, %s, ...) разной длины и числовые литералы
+    схлопываются, чтобы одинаковые по смыслу запросы совпадали.
+    """
+    return NUMBER_RE.sub("?", IN_CLAUSE_RE.sub("IN (...)", sql))
+
+
+def get_view_name(request):
+    """Имя вызванного представления и действия вида RecipeViewSet.list."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f"{view_class.__name__}.{action}"
+
+
+class QueryRecorder:
+    """Счётчик запросов, времени SQL и их форм для одного запроса к API."""
+
+    def __init__(self, track_shapes=True):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.track_shapes = track_shapes
+
+    def add(self, sql, duration):
+        self.duration += duration
+        self.count += 1
+        if self.track_shapes:
+            self.shapes[sql_shape(sql)] += 1
+
+
+current_recorders = ContextVar("current_recorders", default=())
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Передаёт каждый SQL-запрос счётчикам текущего запроса к API.
+
+    Счётчики хранятся в ContextVar, поэтому запросы учитываются и из
+    потоков sync_to_async, которыми пользуются асинхронные представления.
+    """
+    recorders = current_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """Подключает execute_wrapper к каждому новому соединению с базой."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def record_queries(recorder):
+    """Учитывает в recorder все SQL-запросы внутри блока."""
+    token = current_recorders.set(current_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        current_recorders.reset(token)
+
+
+class SyncAndAsyncMiddleware:
+    """Основа middleware, работающего и под WSGI, и под ASGI.
+
+    Под ASGI синхронный middleware заставил бы Django выполнять всю
+    цепочку в одном общем потоке, поэтому метод handle дублируется
+    асинхронным ahandle.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.queries = QueryRecorder()
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.view_started = None
+        self.view_sql = 0.0
+        self.serializer = 0.0
+        self.render = 0.0
+
+    def suspected_n_plus_one(self):
+        threshold = settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD
+        return [
+            {"sql": shape, "count": count}
+            for shape, count in self.queries.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryCountMiddleware(SyncAndAsyncMiddleware):
+    """Замеряет стоимость запросов к API.
+
+    Для каждого запроса считает количество SQL-запросов и их суммарное
+    время, время сериализации (время Python в представлении без учёта SQL),
+    время рендеринга и размер ответа. Результат пишется структурированной
+    строкой в лог api.instrumentation и в заголовок Server-Timing.
+    Повторяющиеся формы SQL помечаются как вероятный N+1.
+    Включается настройкой INSTRUMENTATION_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        metrics = RequestMetrics()
+        request._metrics = metrics
+        with record_queries(metrics.queries):
+            response = self.get_response(request)
+        self.report(request, response, metrics)
+        return response
+
+    async def ahandle(self, request):
+        metrics = RequestMetrics()
+        request._metrics = metrics
+        with record_queries(metrics.queries):
+            response = await self.get_response(request)
+        self.report(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request._metrics
+        metrics.view_name = get_view_name(request)
+        metrics.view_started = time.perf_counter()
+        metrics.view_sql = metrics.queries.duration
+
+    def process_template_response(self, request, response):
+        metrics = request._metrics
+        if metrics.view_started is not None:
+            metrics.serializer = (
+                time.perf_counter()
+                - metrics.view_started
+                - (metrics.queries.duration - metrics.view_sql)
+            )
+        start = time.perf_counter()
+        response.render()
+        metrics.render = time.perf_counter() - start
+        return response
+
+    def report(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        size = (
+            len(response.content) if not response.streaming else None
+        )
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": metrics.view_name,
+            "status": response.status_code,
+            "queries": metrics.queries.count,
+            "sql_ms": round(metrics.queries.duration * 1000, 2),
+            "serializer_ms": round(metrics.serializer * 1000, 2),
+            "render_ms": round(metrics.render * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "response_bytes": size,
+        }
+        n_plus_one = metrics.suspected_n_plus_one()
+        if n_plus_one:
+            record["n_plus_one"] = n_plus_one
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+        response["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={record["sql_ms"]};'
+                f'desc="{metrics.queries.count} queries"',
+                f'serializer;dur={record["serializer_ms"]}',
+                f'render;dur={record["render_ms"]}',
+                f'total;dur={record["total_ms"]}',
+            )
+        )
+
+
+class PrometheusMiddleware(SyncAndAsyncMiddleware):
+    """Собирает метрики Prometheus по представлениям API.
+
+    Для каждого ViewSet.action наблюдаются длительность запроса, число
+    SQL-запросов и их суммарное время. Включается настройкой
+    METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        queries = QueryRecorder(track_shapes=False)
+        start = time.perf_counter()
+        with record_queries(queries):
+            response = self.get_response(request)
+        self.observe(request, queries, start)
+        return response
+
+    async def ahandle(self, request):
+        queries = QueryRecorder(track_shapes=False)
+        start = time.perf_counter()
+        with record_queries(queries):
+            response = await self.get_response(request)
+        self.observe(request, queries, start)
+        return response
+
+    def observe(self, request, queries, start):
+        view = get_view_name(request) or "unresolved"
+        REQUEST_LATENCY.labels(view).observe(time.perf_counter() - start)
+        DB_QUERIES.labels(view).observe(queries.count)
+        DB_DURATION.labels(view).observe(queries.duration)
+
+
+class ReplicaMiddleware(SyncAndAsyncMiddleware):
+    """Направляет чтение безопасных запросов на реплики базы.
+
+    После успешного изменяющего запроса клиент получает cookie
+    DATABASE_REPLICA_PIN_COOKIE и следующие DATABASE_REPLICA_PIN_SECONDS
+    секунд читает с основной базы, чтобы видеть свои изменения, пока
+    реплики их догоняют. Неисправные реплики пропускаются, если исправных
+    нет — чтение идёт с основной базы. Без DATABASE_REPLICAS отключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        token = current_route.set(Route(self.get_replica(request)))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_route.reset(token)
+        return self.pin(request, response)
+
+    async def ahandle(self, request):
+        replica = await sync_to_async(self.get_replica)(request)
+        token = current_route.set(Route(replica))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_route.reset(token)
+        return self.pin(request, response)
+
+    def get_replica(self, request):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            return None
+        if settings.DATABASE_REPLICA_PIN_COOKIE in request.COOKIES:
+            return None
+        return choose_replica()
+
+    def pin(self, request, response):
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                settings.DATABASE_REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class AnonymousCacheMiddleware(SyncAndAsyncMiddleware):
+    """Заголовки кеширования для публичных списков API.
+
+    Ответы на GET и HEAD без Authorization одинаковы для всех анонимных
+    клиентов, им ставится Cache-Control: public на
+    API_ANONYMOUS_CACHE_SECONDS секунд, их кеширует nginx. Ответы
+    пользователям помечаются private. Vary: Authorization не даёт общему
+    кешу отдать анонимный ответ пользователю и наоборот.
+    """
+
+    def __init__(self, get_response):
+        if not settings.API_ANONYMOUS_CACHE_SECONDS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        return self.process(request, self.get_response(request))
+
+    async def ahandle(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if request.method not in (
+            "GET",
+            "HEAD",
+        ) or not request.path.startswith(settings.API_ANONYMOUS_CACHE_PATHS):
+            return response
+        patch_vary_headers(response, ("Authorization",))
+        if response.has_header("Cache-Control"):
+            return response
+        if "HTTP_AUTHORIZATION" in request.META:
+            patch_cache_control(response, private=True, no_cache=True)
+        elif response.status_code == 200:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.API_ANONYMOUS_CACHE_SECONDS,
+                stale_while_revalidate=settings.API_ANONYMOUS_CACHE_STALE,
+            )
+        return response
@@ -0,0 +1,47 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None
+    else 0
+)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSON-рендерер на orjson.
+
+    Кириллица кодируется в UTF-8 без экранирования, как у JSONRenderer
+    с UNICODE_JSON. Даты, Decimal и ленивые строки обрабатываются
+    энкодером DRF, поэтому ответ совпадает с JSONRenderer байт в байт.
+    Если orjson не установлен или запрошен отступ, работает JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            # Например, целые больше 64 бит.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранирует разделители строк, недопустимые
+        # в строковых литералах JavaScript.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
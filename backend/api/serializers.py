@@ -1,9 +1,8 @@
 from django.core.validators import MinValueValidator
 from django.db import transaction
-from django.db.models import Count
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from asyncio import exceptions
-from drf_extra_fields.fields import Base64ImageField
+from jobs.models import Job
 from recipes.models import (
     Ingredient,
     Recipe,
@@ -12,6 +11,7 @@ from recipes.models import (
 )
 from rest_framework import serializers
 from users.models import Follow, MyUser
+from .fields import Base64ImageField
 from .validators import color_validator
 
 
@@ -43,17 +43,61 @@ class MyUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        # Поле модели is_subscribed не связано с подписками,
+        # аннотацию добавляет MyUserViewSet.prune_queryset.
+        if hasattr(obj, "subscribed"):
+            return obj.subscribed
         user = self.context["request"].user
         if user.is_anonymous:
             return False
         return Follow.objects.filter(user=user, author=obj).exists()
 
 
-class UserFollowSerializer(UserSerializer):
+class ShortRecipeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Recipe
+        fields = ("id", "name", "image", "cooking_time")
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Статус фоновой задачи.
+
+    Traceback ошибки видят только сотрудники, остальным отдаётся общее
+    сообщение: в traceback есть пути, код и данные.
+    """
+
+    error = serializers.SerializerMethodField(method_name="get_error")
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "name",
+            "status",
+            "attempts",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+
+    def get_error(self, obj):
+        if not obj.error:
+            return ""
+        request = self.context.get("request")
+        if request is not None and request.user.is_staff:
+            return obj.error
+        if obj.status == Job.FAILED:
+            return "Задача завершилась с ошибкой."
+        return "Попытка завершилась с ошибкой, задача будет повторена."
+
+
+class UserFollowSerializer(MyUserSerializer):
     """Сериализатор вывода авторов на которых только что подписался пользователь.
     В выдачу добавляются рецепты."""
 
-    recipes = serializers.ShortRecipeSerializer(many=True, read_only=True)
+    recipes = serializers.SerializerMethodField(method_name="get_recipes")
     recipes_count = serializers.SerializerMethodField(
         method_name="get_recipes_count"
     )
@@ -72,13 +116,29 @@ class UserFollowSerializer(UserSerializer):
         )
         read_only_fields = ("__all__",)
 
-    def get_recipes(self, obj):
+    # Рецепты автора без ?expand=recipes (api/fieldsets.py).
+    compact_fields = {
+        "recipes": lambda: serializers.SerializerMethodField(
+            method_name="get_recipe_ids"
+        ),
+    }
+
+    def get_author_recipes(self, obj):
         author_recipes = Recipe.objects.filter(author=obj)
         if "recipes_limit" in self.context.get("request").GET:
             recipes_limit = self.context.get("request").GET["recipes_limit"]
             author_recipes = author_recipes[: int(recipes_limit)]
+        return author_recipes
+
+    def get_recipe_ids(self, obj):
+        return list(
+            self.get_author_recipes(obj).values_list("id", flat=True)
+        )
+
+    def get_recipes(self, obj):
+        author_recipes = self.get_author_recipes(obj)
         if author_recipes:
-            serializer = self.get_srs()(
+            serializer = ShortRecipeSerializer(
                 author_recipes,
                 context={"request": self.context.get("request")},
                 many=True,
@@ -87,11 +147,9 @@ class UserFollowSerializer(UserSerializer):
         return []
 
     def get_recipes_count(self, obj):
-        return (
-            Recipe.objects.filter(author=obj)
-            .annotate(num_recipes=Count("recipes_limit"))
-            .count()
-        )
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
+        return Recipe.objects.filter(author=obj).count()
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -131,6 +189,16 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeIngredientAmountSerializer(serializers.ModelSerializer):
+    """Ингредиент рецепта без названия и единицы измерения"""
+
+    id = serializers.ReadOnlyField(source="ingredient_id")
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ("id", "amount")
+
+
 class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
     amount = serializers.IntegerField(
@@ -165,7 +233,7 @@ class GetRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = ("pub_date", "tags_mask", "updated_at")
 
     def validate_tags(self, value):
         if not value:
@@ -245,9 +313,20 @@ class RecipeSerializer(serializers.ModelSerializer):
         method_name="get_is_in_shopping_cart"
     )
 
+    # Связи без ?expand= выводятся идентификаторами (api/fieldsets.py).
+    compact_fields = {
+        "author": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        "tags": lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True
+        ),
+        "ingredients": lambda: RecipeIngredientAmountSerializer(
+            source="recipe_ingredients", many=True, read_only=True
+        ),
+    }
+
     class Meta:
         model = Recipe
-        fields = "__all__"
+        exclude = ("tags_mask", "updated_at")
 
     def validate_cooking_time(self, value):
         if not isinstance(value, int):
@@ -261,18 +340,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         return value
 
     def get_ingredients(self, obj):
-        ingredients = obj.ingredients.all()
+        ingredients = obj.recipe_ingredients.all()
         serializer = RecipeIngredientSerializer(ingredients, many=True)
         return serializer.data
 
     def get_is_favorited(self, obj):
-        return obj.is_favorited
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
+        user = self.context["request"].user
+        return (
+            user.is_authenticated
+            and obj.favorite.filter(user=user).exists()
+        )
 
     def get_is_in_shopping_cart(self, obj):
-        return obj.is_in_shopping_cart
-
-
-class ShortRecipeSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
+        user = self.context["request"].user
+        return user.is_authenticated and obj.cart.filter(user=user).exists()
@@ -0,0 +1,38 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.local_cache import catalogue_cache, recipe_cache
+
+
+class FastSerializersTest(TestCase):
+    """Быстрый путь и кеши выдают тот же JSON, что и сериализаторы DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_data",
+            users=8,
+            recipes=40,
+            ingredients=60,
+            follows_per_user=3,
+            favorites_per_user=5,
+            carts_per_user=3,
+            seed=1,
+            stdout=StringIO(),
+        )
+
+    def setUp(self):
+        catalogue_cache.clear()
+        recipe_cache.clear()
+
+    def test_output_matches_drf(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                CATALOGUE_SNAPSHOT_PATH=f"{directory}/catalogue.bin"
+            ):
+                call_command(
+                    "check_fast_serializers", users=3, stdout=StringIO()
+                )
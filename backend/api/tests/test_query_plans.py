@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+
+class QueryPlansTest(TestCase):
+    """Частые запросы API не просматривают большие таблицы целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_data",
+            users=8,
+            recipes=40,
+            ingredients=60,
+            follows_per_user=3,
+            favorites_per_user=5,
+            carts_per_user=3,
+            seed=1,
+            stdout=StringIO(),
+        )
+
+    def test_no_full_scans(self):
+        if connection.vendor == "postgresql":
+            # На маленькой базе полный просмотр дешевле индекса. Без него
+            # планировщик выбирает Seq Scan, только если индекса нет.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        call_command("check_query_plans", stdout=StringIO())
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import IngredientViewSet, MyUserViewSet, RecipeViewSet, TagViewSet
+from .views import (
+    IngredientViewSet,
+    JobViewSet,
+    MyUserViewSet,
+    RecipeViewSet,
+    TagViewSet,
+)
 
 app_name = "api"
 
@@ -11,6 +18,7 @@ router.register(r"users", MyUserViewSet, basename="users")
 router.register(r"tags", TagViewSet, basename="tags")
 router.register(r"ingredients", IngredientViewSet, basename="ingredients")
 router.register(r"recipes", RecipeViewSet, basename="recipes")
+router.register(r"jobs", JobViewSet, basename="jobs")
 
 
 urlpatterns = [
@@ -34,3 +42,30 @@ urlpatterns = [
         name="shopping_cart",
     ),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    urlpatterns = [
+        path("tags/", async_views.tag_list, name="async-tags-list"),
+        path(
+            "tags/<int:pk>/",
+            async_views.tag_detail,
+            name="async-tags-detail",
+        ),
+        path(
+            "ingredients/",
+            async_views.ingredient_list,
+            name="async-ingredients-list",
+        ),
+        path(
+            "ingredients/<int:pk>/",
+            async_views.ingredient_detail,
+            name="async-ingredients-detail",
+        ),
+        path(
+            "recipes/download_shopping_cart/",
+            async_views.download_shopping_cart,
+            name="async-recipes-download_shopping_cart",
+        ),
+    ] + urlpatterns
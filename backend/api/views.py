@@ -1,37 +1,84 @@
+import hashlib
+import os
+from operator import attrgetter, itemgetter
+
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
 from djoser.views import UserViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets, exceptions, filters
-from django.db.models import Exists, Sum, OuterRef
+from django.conf import settings
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
 
 
 from django_filters.rest_framework import DjangoFilterBackend
 
 from users.pagination import CustomPageNumberPagination
 
-from .filters import RecipeFilterBackend
+from .batch import in_request_order, is_batch, parse_ids
+from .facets import recipe_facets
+from .fast_serializers import (
+    RECIPE_FIELDS,
+    RECIPE_RELATIONS,
+    recipe_values,
+    serialize_recipes,
+)
+from .fieldsets import apply_fieldset, parse_fieldset
+from .files import private_file_response
+from .filters import RecipeFilter
+from .catalogue import list_ingredients, list_tags
+from .local_cache import get_recipe_summaries
+from .metrics import (
+    SHOPPING_LIST_EXPORT_BYTES,
+    SHOPPING_LIST_EXPORT_DURATION,
+)
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     UserFollowSerializer,
     TagSerializer,
     IngredientSerializer,
     GetRecipeSerializer,
+    JobSerializer,
+    MyUserSerializer,
     RecipeSerializer,
     ShortRecipeSerializer,
 )
 from users.models import MyUser, Follow
+from jobs.models import Job
+from jobs.queue import enqueue, restart
 from recipes.models import (
     Tag,
     Ingredient,
     Recipe,
+    RecipeIngredient,
     Favorite,
     ShopingList,
-    RecipeIngredient,
+    SimilarRecipe,
 )
+from recipes.shopping_list import (
+    EXPORT_TYPES,
+    export_path,
+    get_shopping_list,
+    shopping_list_hash,
+    shopping_list_lines,
+)
+from recipes.tasks import render_shopping_list
+from recipes.trending import bump_score
 
 
 User = get_user_model()
@@ -42,6 +89,71 @@ class MyUserViewSet(UserViewSet):
 
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = CustomPageNumberPagination
+    # Действия, поддерживающие ?fields= и ?expand= (api/fieldsets.py).
+    fieldset_actions = ("list", "retrieve", "me", "subscriptions")
+    model_fields = ("email", "username", "first_name", "last_name")
+
+    @cached_property
+    def fieldset(self):
+        if self.action == "subscriptions":
+            return parse_fieldset(
+                self.request, UserFollowSerializer.Meta.fields, ("recipes",)
+            )
+        return parse_fieldset(self.request, MyUserSerializer.Meta.fields)
+
+    def uses_fieldset(self):
+        return (
+            self.request.method == "GET"
+            and self.action in self.fieldset_actions
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.uses_fieldset():
+            queryset = self.prune_queryset(queryset)
+        return queryset
+
+    def prune_queryset(self, queryset):
+        """Читает только запрошенные поля, подписку и число рецептов
+        считает в том же запросе."""
+        fieldset = self.fieldset
+        user = self.request.user
+        queryset = queryset.only(
+            "id", *(name for name in self.model_fields if name in fieldset)
+        )
+        if "is_subscribed" in fieldset and user.is_authenticated:
+            queryset = queryset.annotate(
+                subscribed=Exists(
+                    Follow.objects.filter(user=user, author=OuterRef("pk"))
+                )
+            )
+        elif "is_subscribed" in fieldset:
+            queryset = queryset.annotate(
+                subscribed=Value(False, output_field=BooleanField())
+            )
+        if "recipes_count" in fieldset:
+            # В запросах с GROUP BY Meta.ordering не применяется.
+            queryset = queryset.annotate(
+                recipes_count=Count("recipe")
+            ).order_by(*MyUser._meta.ordering)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.uses_fieldset():
+            apply_fieldset(serializer, self.fieldset)
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        if not is_batch(request):
+            return super().list(request, *args, **kwargs)
+        # Как и карточка пользователя, пакет не ограничивается HIDE_USERS.
+        ids = parse_ids(request)
+        users = self.prune_queryset(MyUser.objects.filter(id__in=ids))
+        serializer = self.get_serializer(
+            in_request_order(users, ids, attrgetter("pk")), many=True
+        )
+        return Response(serializer.data)
 
     @action(
         methods=["GET"],
@@ -55,11 +167,16 @@ class MyUserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Выдает авторов, на кого подписан пользователь"""
         user = request.user
-        queryset = MyUser.objects.filter(following__user=user)
+        queryset = self.prune_queryset(
+            MyUser.objects.filter(following__user=user)
+        )
         pages = self.paginate_queryset(queryset)
         serializer = UserFollowSerializer(
             pages, many=True, context={"request": request}
         )
+        apply_fieldset(
+            serializer, self.fieldset, UserFollowSerializer.compact_fields
+        )
         return self.get_paginated_response(serializer.data)
 
     @action(
@@ -108,6 +225,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
 
+    def list(self, request, *args, **kwargs):
+        return Response(list_tags())
+
 
 class IngredientViewSet(viewsets.ModelViewSet):
     """Viewset для объектов модели Ingredient"""
@@ -119,6 +239,23 @@ class IngredientViewSet(viewsets.ModelViewSet):
     search_fields = ("^name",)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        terms = filters.SearchFilter().get_search_terms(request)
+        return Response(list_ingredients(terms))
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Статус фоновых задач пользователя"""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = CustomPageNumberPagination
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Viewset для объектов модели Recipe"""
@@ -126,23 +263,156 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.prefetch_related("recipe_ingredients").all()
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
-    filterset_class = [RecipeFilterBackend]
+    filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
         user = self.request.user
 
-        qs = Recipe.objects.annotate(
-            is_favorited=Exists(
-                Favorite.objects.filter(user=user, recipe_id=OuterRef("pk"))
-            ),
-            is_in_shopping_cart=Exists(
-                ShopingList.objects.filter(user=user, recipe_id=OuterRef("pk"))
-            ),
-        )
+        if user.is_authenticated:
+            qs = Recipe.objects.annotate(
+                is_favorited=Exists(
+                    Favorite.objects.filter(
+                        user=user, recipe_id=OuterRef("pk")
+                    )
+                ),
+                is_in_shopping_cart=Exists(
+                    ShopingList.objects.filter(
+                        user=user, recipe_id=OuterRef("pk")
+                    )
+                ),
+            )
+        else:
+            qs = Recipe.objects.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+
+        if self.request.query_params.get("ordering") == "trending":
+            qs = qs.order_by(
+                F("score__value").desc(nulls_last=True), "-pub_date"
+            )
+        if self.action == "retrieve":
+            qs = self.prune_queryset(qs)
 
         return qs
 
+    @cached_property
+    def fieldset(self):
+        return parse_fieldset(self.request, RECIPE_FIELDS, RECIPE_RELATIONS)
+
+    def prune_queryset(self, queryset):
+        """Читает только запрошенные поля и связи рецепта."""
+        fieldset = self.fieldset
+        columns = ["id"]
+        columns += (
+            name
+            for name in ("name", "image", "text", "cooking_time", "pub_date")
+            if name in fieldset
+        )
+        if fieldset.expanded("author"):
+            queryset = queryset.select_related("author")
+            columns.append("author")
+        elif "author" in fieldset:
+            columns.append("author_id")
+        if "tags" in fieldset:
+            queryset = queryset.prefetch_related("tags")
+        if fieldset.expanded("ingredients"):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "recipe_ingredients",
+                    RecipeIngredient.objects.select_related("ingredient"),
+                )
+            )
+        elif "ingredients" in fieldset:
+            queryset = queryset.prefetch_related("recipe_ingredients")
+        return queryset.only(*columns)
+
+    def filter_by_pk(self, queryset):
+        """queryset по pk из адреса, 404 для некорректного pk,
+        как в get_object_or_404 из DRF."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+    def get_validators(self):
+        """ETag и время изменения карточки рецепта одним запросом по pk.
+
+        Для пользователя ETag учитывает его избранное, список покупок
+        и подписку на автора, а Last-Modified не отдаётся: эти флаги
+        меняются без изменения рецепта.
+        """
+        user = self.request.user
+        queryset = self.filter_by_pk(Recipe.objects.all())
+        flags = ()
+        if user.is_authenticated:
+            flags = ("favorited", "in_cart", "subscribed")
+            queryset = queryset.annotate(
+                favorited=Exists(
+                    Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+                ),
+                in_cart=Exists(
+                    ShopingList.objects.filter(
+                        user=user, recipe=OuterRef("pk")
+                    )
+                ),
+                subscribed=Exists(
+                    Follow.objects.filter(
+                        user=user, author=OuterRef("author_id")
+                    )
+                ),
+            )
+        row = queryset.values_list("updated_at", *flags).first()
+        if row is None:
+            return None, None
+        updated_at, *values = row
+        etag = "-".join(
+            [str(int(updated_at.timestamp() * 1000000))]
+            + [str(int(value)) for value in values]
+            + [self.representation_key()]
+        )
+        if flags:
+            return etag, None
+        return etag, int(updated_at.timestamp())
+
+    def representation_key(self):
+        """Хеш ?fields=, ?expand= и формата ответа: у каждого варианта
+        карточки свой ETag."""
+        fieldset = self.fieldset
+        expand = None if fieldset.expand is None else sorted(fieldset.expand)
+        variant = repr(
+            (fieldset.fields, expand, self.request.accepted_media_type)
+        )
+        return hashlib.md5(variant.encode()).hexdigest()[:8]
+
+    def retrieve(self, request, *args, **kwargs):
+        """Карточка рецепта, 304 по If-None-Match и If-Modified-Since"""
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=quote_etag(etag), last_modified=last_modified
+        )
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response["ETag"] = quote_etag(etag)
+        patch_vary_headers(response, ("Accept",))
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action == "retrieve":
+            apply_fieldset(
+                serializer, self.fieldset, RecipeSerializer.compact_fields
+            )
+        return serializer
+
     def get_serializer_class(self):
         """Определяет какой сериализатор использовать"""
         if self.action in ("create", "partial_update"):
@@ -150,6 +420,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return RecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        """Список рецептов через быстрый путь fast_serializers"""
+        fieldset = self.fieldset
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *recipe_values(fieldset)
+        )
+        if is_batch(request):
+            ids = parse_ids(request)
+            rows = in_request_order(
+                queryset.filter(id__in=ids), ids, itemgetter("id")
+            )
+            return Response(serialize_recipes(rows, request, fieldset))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serialize_recipes(queryset, request, fieldset))
+        return self.get_paginated_response(
+            serialize_recipes(page, request, fieldset)
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
     @action(
         methods=[
             "POST",
@@ -171,17 +463,6 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(
-        methods=[
-            "DELETE",
-        ],
-        detail=False,
-        url_path="recipes",
-        url_name="recipes",
-        permission_classes=[
-            IsAuthenticated,
-        ],
-    )
     @action(
         methods=["POST", "DELETE"],
         detail=True,
@@ -197,6 +478,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             if Favorite.objects.filter(user=user, recipe=recipe).exists():
                 raise exceptions.ValidationError("Рецепт уже в избранном.")
             Favorite.objects.create(user=user, recipe=recipe)
+            bump_score(recipe, settings.TRENDING_FAVORITE_WEIGHT)
             serializer = ShortRecipeSerializer(
                 recipe, context={"request": request}
             )
@@ -211,6 +493,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="facets",
+        url_name="facets",
+    )
+    def facets(self, request):
+        """Счётчики фильтров ленты для параметров запроса"""
+        return Response(recipe_facets(request, Recipe.objects.all()))
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="similar",
+        url_name="similar",
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты, рассчитанные командой compute_similar_recipes"""
+        if not self.filter_by_pk(Recipe.objects.all()).exists():
+            raise Http404
+        similar_ids = (
+            SimilarRecipe.objects.filter(recipe_id=pk)
+            .order_by("rank")
+            .values_list("similar_id", flat=True)
+        )
+        return Response(
+            [
+                summary.to_dict(request)
+                for summary in get_recipe_summaries(list(similar_ids))
+            ]
+        )
+
     @action(
         methods=["GET"],
         detail=False,
@@ -221,29 +535,78 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ],
     )
     def download_shopping_cart(self, request):
-        """Скачать список покупок"""
-        shopping_cart = ShopingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        buy_list = (
-            RecipeIngredient.objects.filter(recipe__in=recipes)
-            .values("ingredient")
-            .annotate(amount=Sum("amount"))
+        """Скачать список покупок.
+
+        ?type=pdf или ?type=html готовит файл в фоновой задаче: пока он
+        не готов, ответ 202 со статусом задачи, запрос нужно повторить.
+        """
+        export_type = request.query_params.get("type", "txt")
+        if export_type != "txt":
+            return self.export_shopping_cart(request, export_type)
+        with SHOPPING_LIST_EXPORT_DURATION.time():
+            response = self.build_shopping_cart(request)
+        SHOPPING_LIST_EXPORT_BYTES.observe(len(response.content))
+        return response
+
+    def build_shopping_cart(self, request):
+        """Формирует текстовый файл списка покупок"""
+        buy_list = get_shopping_list(self.request.user)
+        response = HttpResponse(
+            "".join(shopping_list_lines(buy_list)), content_type="text/plain"
         )
-        buy_list_text = "Список покупок:\n\n"
-        for item in buy_list:
-            ingredient = Ingredient.objects.get(pk=item["ingredient"])
-            amount = item["amount"]
-            buy_list_text += (
-                f"{ingredient.name}, {amount} "
-                f"{ingredient.measurement_unit}\n"
-            )
-        response = HttpResponse(buy_list_text, content_type="text/plain")
         response[
             "Content-Disposition"
         ] = "attachment; filename=shopping-list.txt"
 
         return response
 
+    def export_shopping_cart(self, request, export_type):
+        """Готовый файл выгрузки или фоновая задача, которая его создаёт"""
+        if export_type not in EXPORT_TYPES:
+            raise exceptions.ValidationError(
+                {"type": f"Доступные форматы: txt, {', '.join(EXPORT_TYPES)}."}
+            )
+        buy_list = get_shopping_list(request.user)
+        digest = shopping_list_hash(buy_list)
+        path = export_path(digest, export_type)
+        if not os.path.exists(path):
+            job = enqueue(
+                render_shopping_list.name,
+                kwargs={"rows": buy_list, "export_type": export_type},
+                user=request.user,
+                idempotency_key=(
+                    f"shopping_list:{request.user.pk}:{digest}.{export_type}"
+                ),
+            )
+            if job.status == Job.SUCCEEDED:
+                # Файл удалён очисткой.
+                job = restart(job)
+            if job.status == Job.FAILED:
+                # Попытки исчерпаны, повторять по опросу клиента бесполезно:
+                # задачу перезапускают из админки после исправления.
+                return Response(
+                    JobSerializer(job, context={"request": request}).data,
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            if not os.path.exists(path):
+                return Response(
+                    JobSerializer(job, context={"request": request}).data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={
+                        "Location": request.get_full_path(),
+                        "Retry-After": "1",
+                    },
+                )
+        SHOPPING_LIST_EXPORT_BYTES.observe(os.path.getsize(path))
+        return private_file_response(
+            path,
+            settings.SHOPPING_LIST_EXPORT_ROOT,
+            settings.SHOPPING_LIST_ACCEL_REDIRECT,
+            EXPORT_TYPES[export_type],
+            f"shopping-list.{export_type}",
+            inline=export_type == "html",
+        )
+
     @action(
         methods=["POST", "DELETE"],
         detail=True,
@@ -263,6 +626,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     "Рецепт уже в списке покупок."
                 )
             ShopingList.objects.create(user=user, recipe=recipe)
+            bump_score(recipe, settings.TRENDING_CART_WEIGHT)
             serializer = ShortRecipeSerializer(
                 recipe, context={"request": request}
             )
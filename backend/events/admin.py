@@ -0,0 +1,13 @@
+from django.contrib import admin
+from users.pagination import EstimatedCountPaginator
+
+from .models import RecipeEvent
+
+
+@admin.register(RecipeEvent)
+class RecipeEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'recipe', 'author', 'created_at')
+    list_filter = ('kind',)
+    raw_id_fields = ('recipe', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class EventsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'events'
+    verbose_name = 'События'
+
+    def ready(self):
+        from recipes.models import Recipe
+
+        from .broker import recipe_saved
+
+        post_save.connect(recipe_saved, sender=Recipe)
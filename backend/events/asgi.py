@@ -0,0 +1,176 @@
+"""Поток server-sent events /api/events/ поверх приложения ASGI.
+
+Django 3.2 не умеет отдавать асинхронный поток из представления, поэтому
+поток обслуживает отдельное приложение ASGI, а остальные запросы
+передаются Django. Клиент получает события о новых и изменённых рецептах
+авторов, на которых подписан:
+
+    id: 42
+    event: recipe.created
+    data: {"recipe": 7, "author": 3}
+
+Токен передаётся заголовком Authorization: Token <ключ> или, для
+EventSource в браузере, параметром ?token=<ключ>. Раз в EVENTS_HEARTBEAT
+секунд приходит комментарий-пинг, заодно перечитываются подписки.
+При переподключении с заголовком Last-Event-ID (или параметром
+last_event_id) пропущенные события дочитываются из журнала.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+from users.models import Follow
+
+from .broker import events_after, hub, run_in_thread
+
+
+def get_token_key(headers, query):
+    """Ключ токена из заголовка Authorization: Token <ключ> или из
+    параметра token: EventSource в браузере не умеет задавать заголовки."""
+    header = headers.get(b"authorization", b"").decode().split()
+    if len(header) == 2 and header[0].lower() == "token":
+        return header[1]
+    return query.get("token", [None])[0]
+
+
+def get_user(key):
+    token = Token.objects.select_related("user").filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def followed_authors(user):
+    return set(
+        Follow.objects.filter(user=user).values_list("author_id", flat=True)
+    )
+
+
+def format_event(event):
+    data = json.dumps({"recipe": event.recipe_id, "author": event.author_id})
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n".encode()
+
+
+def parse_last_event_id(headers, query):
+    value = headers.get(b"last-event-id", b"").decode()
+    if not value:
+        value = query.get("last_event_id", [""])[0]
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+async def send_json(send, status, data):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send(
+        {
+            "type": "http.response.body",
+            "body": json.dumps(data, ensure_ascii=False).encode(),
+        }
+    )
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def stream(scope, receive, send):
+    if scope["method"] != "GET":
+        return await send_json(
+            send, 405, {"detail": f'Метод "{scope["method"]}" не разрешен.'}
+        )
+    headers = dict(scope["headers"])
+    query = parse_qs(scope.get("query_string", b"").decode())
+    key = get_token_key(headers, query)
+    user = await run_in_thread(get_user)(key) if key else None
+    if user is None:
+        return await send_json(
+            send, 401, {"detail": "Учетные данные не были предоставлены."}
+        )
+    authors = await run_in_thread(followed_authors)(user)
+    last_id = parse_last_event_id(headers, query)
+
+    # Подписка до чтения журнала, чтобы не потерять события между ними.
+    subscription = await hub.subscribe(authors)
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        body = f"retry: {settings.EVENTS_RETRY_MS}\n\n".encode()
+        truncated = False
+        replayed = set()
+        if last_id is not None:
+            missed = await run_in_thread(events_after)(
+                last_id, authors, settings.EVENTS_REPLAY_LIMIT
+            )
+            body += b"".join(format_event(event) for event in missed)
+            replayed = {event.id for event in missed}
+            # Остаток журнала клиент дочитает при следующем подключении.
+            truncated = len(missed) == settings.EVENTS_REPLAY_LIMIT
+        await send(
+            {"type": "http.response.body", "body": body, "more_body": True}
+        )
+        while not (
+            truncated or disconnected.done() or subscription.overflowed
+        ):
+            next_event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnected},
+                timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if next_event not in done:
+                next_event.cancel()
+                if disconnected in done:
+                    break
+                subscription.authors = await run_in_thread(
+                    followed_authors
+                )(user)
+                body = b": ping\n\n"
+            else:
+                event = next_event.result()
+                # Событие могло уже прийти из журнала при переподключении.
+                if event.id in replayed:
+                    continue
+                body = format_event(event)
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": True}
+            )
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        hub.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+class EventStreamApplication:
+    """Отдаёт EVENTS_PATH потоку событий, остальное — приложению app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == settings.EVENTS_PATH:
+            return await stream(scope, receive, send)
+        return await self.app(scope, receive, send)
@@ -0,0 +1,248 @@
+"""Рассылка событий о рецептах подписчикам потока /api/events/.
+
+Сохранение рецепта пишет RecipeEvent после коммита транзакции и передаёт
+его бэкенду EVENTS_BACKEND. Бэкенд доставляет события хабу процесса,
+а хаб раскладывает их по очередям подключённых клиентов с учётом их
+подписок на авторов:
+
+* LocalBackend передаёт событие хабу сразу, но только в своём процессе —
+  для одного процесса ASGI и разработки;
+* DatabaseBackend раз в EVENTS_POLL_INTERVAL секунд читает новые записи
+  журнала одним запросом на процесс и видит события всех процессов.
+"""
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import RecipeEvent
+
+logger = logging.getLogger("events")
+
+EVENT_FIELDS = ("id", "kind", "recipe_id", "author_id")
+
+Event = namedtuple("Event", EVENT_FIELDS)
+
+# Сколько пропусков в id журнала отслеживает DatabaseBackend.
+MAX_GAPS = 1000
+
+
+def run_in_thread(func):
+    """Синхронная функция с ORM в пуле потоков, как в api.async_views."""
+
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+def events_after(last_id, authors=None, limit=None):
+    """События журнала с id больше last_id по порядку."""
+    queryset = RecipeEvent.objects.filter(id__gt=last_id).order_by("id")
+    if authors is not None:
+        queryset = queryset.filter(author_id__in=authors)
+    if limit is not None:
+        queryset = queryset[:limit]
+    return [Event(*row) for row in queryset.values_list(*EVENT_FIELDS)]
+
+
+def recent_event_ids(limit):
+    """id последних limit событий журнала по возрастанию."""
+    return sorted(
+        RecipeEvent.objects.order_by("-id").values_list("id", flat=True)[
+            :limit
+        ]
+    )
+
+
+def poll_events(last_id, gaps):
+    """События после last_id и появившиеся события с id из gaps."""
+    available = Q(id__gt=last_id)
+    if gaps:
+        available |= Q(id__in=gaps)
+    queryset = RecipeEvent.objects.filter(available).order_by("id")
+    return [Event(*row) for row in queryset.values_list(*EVENT_FIELDS)]
+
+
+class Cursor:
+    """Позиция опроса журнала с учётом пропусков в id.
+
+    Транзакции фиксируются не в порядке выдачи id: событие N+1 может
+    стать видно раньше N. Пропущенные id перечитываются ещё
+    EVENTS_GAP_TIMEOUT секунд, дольше ждать нечего: id откаченной
+    транзакции не появится никогда.
+    """
+
+    def __init__(self, recent_ids):
+        self.last_id = recent_ids[0] - 1 if recent_ids else 0
+        self.gaps = {}
+        self.advance(recent_ids)
+
+    def advance(self, ids):
+        """Учитывает прочитанные id по возрастанию, возвращает новые."""
+        now = time.monotonic()
+        deadline = now + settings.EVENTS_GAP_TIMEOUT
+        fresh = []
+        for pk in ids:
+            if self.gaps.pop(pk, None) is not None:
+                fresh.append(pk)
+            elif pk > self.last_id:
+                for missing in range(self.last_id + 1, pk):
+                    if len(self.gaps) >= MAX_GAPS:
+                        break
+                    self.gaps[missing] = deadline
+                self.last_id = pk
+                fresh.append(pk)
+        self.gaps = {
+            pk: expires for pk, expires in self.gaps.items() if expires > now
+        }
+        return fresh
+
+
+class Subscription:
+    """Очередь событий одного клиента.
+
+    Если клиент не успевает читать, очередь помечается переполненной,
+    и поток закрывается: клиент переподключится с Last-Event-ID
+    и дочитает пропущенное из журнала.
+    """
+
+    def __init__(self, authors):
+        self.authors = authors
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.overflowed or event.author_id not in self.authors:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Hub:
+    """Подписчики процесса. Работает в цикле событий сервера ASGI."""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.loop = None
+        self.task = None
+        self.started = None
+
+    async def subscribe(self, authors):
+        """Подписывает клиента, когда бэкенд уже знает, с какого события
+        читать: журнал, дочитанный после этого, не разойдётся с потоком."""
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(authors)
+        self.subscriptions.add(subscription)
+        if self.task is None or self.task.done():
+            self.started = self.loop.create_future()
+            self.task = self.loop.create_task(get_backend().run(self))
+        try:
+            await asyncio.shield(self.started)
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def dispatch(self, events):
+        for event in events:
+            for subscription in self.subscriptions:
+                subscription.offer(event)
+
+    def dispatch_threadsafe(self, events):
+        """dispatch из синхронного кода, например из обработчика сигнала."""
+        loop = self.loop
+        if loop is None or loop.is_closed() or not self.subscriptions:
+            return
+        loop.call_soon_threadsafe(self.dispatch, events)
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    """События только своего процесса, без опроса базы."""
+
+    def publish(self, event):
+        hub.dispatch_threadsafe([event])
+
+    async def run(self, hub):
+        hub.started.set_result(None)
+
+
+class DatabaseBackend:
+    """События всех процессов из журнала RecipeEvent.
+
+    Опрос идёт, пока в процессе есть подключённые клиенты, и начинается
+    с последнего события в журнале на момент первой подписки. Позицию
+    и пропуски в id ведёт Cursor.
+    """
+
+    def publish(self, event):
+        pass
+
+    async def run(self, hub):
+        try:
+            cursor = Cursor(
+                await run_in_thread(recent_event_ids)(MAX_GAPS)
+            )
+        except Exception as error:
+            hub.started.set_exception(error)
+            return
+        hub.started.set_result(None)
+        while hub.subscriptions:
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+            try:
+                events = await run_in_thread(poll_events)(
+                    cursor.last_id, list(cursor.gaps)
+                )
+            except Exception:
+                logger.exception("Не удалось прочитать журнал событий")
+                continue
+            fresh = set(cursor.advance([event.id for event in events]))
+            events = [event for event in events if event.id in fresh]
+            if events:
+                hub.dispatch(events)
+
+
+backend = None
+
+
+def get_backend():
+    global backend
+    if backend is None:
+        backend = import_string(settings.EVENTS_BACKEND)()
+    return backend
+
+
+def record_event(kind, recipe):
+    event = RecipeEvent.objects.create(
+        kind=kind, recipe_id=recipe.pk, author_id=recipe.author_id
+    )
+    get_backend().publish(
+        Event(event.pk, kind, event.recipe_id, event.author_id)
+    )
+
+
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    """Записывает событие после коммита, когда рецепт уже виден
+    другим соединениям."""
+    if raw:
+        return
+    kind = RecipeEvent.CREATED if created else RecipeEvent.UPDATED
+    transaction.on_commit(lambda: record_event(kind, instance))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from events.models import RecipeEvent
+
+
+class Command(BaseCommand):
+    help = "Удаляет старые события рецептов из журнала"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Удалять события старше стольких часов",
+        )
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(hours=options["hours"])
+        removed, _ = RecipeEvent.objects.filter(
+            created_at__lt=deadline
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Удалено событий: {removed}"))
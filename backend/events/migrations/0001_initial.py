@@ -0,0 +1,37 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('recipes', '0009_recipe_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe.created', 'Новый рецепт'), ('recipe.updated', 'Рецепт изменён')], max_length=32, verbose_name='Событие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_events', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Событие рецепта',
+                'verbose_name_plural': 'События рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipeevent',
+            index=models.Index(fields=['created_at'], name='recipe_event_created_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import models
+
+
+class RecipeEvent(models.Model):
+    """Событие о рецепте для потока /api/events/.
+
+    Журнал нужен, чтобы переподключившийся клиент получил пропущенные
+    события по Last-Event-ID, а воркеры других процессов — события,
+    записанные не у них.
+    """
+
+    CREATED = "recipe.created"
+    UPDATED = "recipe.updated"
+    KIND_CHOICES = (
+        (CREATED, "Новый рецепт"),
+        (UPDATED, "Рецепт изменён"),
+    )
+
+    kind = models.CharField(
+        max_length=32, choices=KIND_CHOICES, verbose_name="Событие"
+    )
+    recipe = models.ForeignKey(
+        "recipes.Recipe",
+        on_delete=models.CASCADE,
+        related_name="events",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recipe_events",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Время"
+    )
+
+    class Meta:
+        ordering = ("id",)
+        verbose_name = "Событие рецепта"
+        verbose_name_plural = "События рецептов"
+        indexes = [
+            models.Index(
+                fields=("created_at",), name="recipe_event_created_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.recipe_id}"
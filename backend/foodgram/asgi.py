@@ -3,5 +3,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Модели доступны только после настройки Django в get_asgi_application.
+from events.asgi import EventStreamApplication  # noqa: E402
+
+application = EventStreamApplication(django_application)
@@ -0,0 +1,76 @@
+"""Индексы и миграции индексов для работающей базы."""
+from django.contrib.postgres.indexes import OpClass
+from django.db import NotSupportedError, models
+from django.db.migrations.operations import AddIndex
+from django.db.models.functions import Upper
+
+
+class PrefixSearchIndex(models.Index):
+    """Индекс для поиска по началу строки без учёта регистра.
+
+    На PostgreSQL istartswith превращается в UPPER(поле::text) LIKE
+    UPPER('префикс%'), поэтому индекс строится по тому же выражению
+    с классом операторов text_pattern_ops: без него LIKE не использует
+    индекс, если локаль базы отличается от C. На других базах класс
+    операторов не указывается.
+    """
+
+    def __init__(self, field, name):
+        self.field = field
+        super().__init__(Upper(field), name=name)
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql":
+            index = models.Index(
+                OpClass(Upper(self.field), name="text_pattern_ops"),
+                name=self.name,
+            )
+            return index.create_sql(model, schema_editor, using, **kwargs)
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+    def deconstruct(self):
+        path, _, _ = super().deconstruct()
+        return path, (self.field,), {"name": self.name}
+
+
+class AddIndexConcurrently(AddIndex):
+    """AddIndex без блокировки записи в таблицу.
+
+    На PostgreSQL индекс строится через CREATE INDEX CONCURRENTLY, для
+    этого миграция должна быть объявлена с atomic = False. На других
+    базах индекс создаётся как обычно.
+    """
+
+    atomic = False
+
+    def database_forwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(
+                model, self.index, **self.options(schema_editor)
+            )
+
+    def database_backwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(
+                model, self.index, **self.options(schema_editor)
+            )
+
+    def describe(self):
+        return f"{super().describe()} (concurrently)"
+
+    def options(self, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != "postgresql":
+            return {}
+        if connection.in_atomic_block:
+            raise NotSupportedError(
+                "CREATE INDEX CONCURRENTLY нельзя выполнить в транзакции, "
+                "объявите миграцию с atomic = False."
+            )
+        return {"concurrently": True}
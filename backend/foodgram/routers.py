@@ -0,0 +1,119 @@
+"""Чтение с реплик базы данных.
+
+Реплику для запроса выбирает api.middleware.ReplicaMiddleware и кладёт
+её в current_route. Вне запросов (команды, воркеры) и после первой
+записи в запросе чтение идёт с основной базы.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger("foodgram.routers")
+
+
+class Route:
+    """Куда читать в рамках одного запроса."""
+
+    __slots__ = ("replica",)
+
+    def __init__(self, replica):
+        self.replica = replica
+
+
+current_route = ContextVar("current_route", default=None)
+
+health = {}
+health_lock = threading.Lock()
+replica_cycle = None
+
+
+def replica_lag(alias):
+    """Отставание реплики PostgreSQL в секундах, для других баз 0."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            cursor.execute("SELECT 1")
+            return 0.0
+        # Без новых записей время последней применённой транзакции
+        # не меняется, поэтому отставание считается только пока реплика
+        # не догнала основную базу.
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() "
+            "= pg_last_wal_replay_lsn() THEN 0 ELSE COALESCE(EXTRACT(EPOCH "
+            "FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    """Доступна ли реплика и не слишком ли отстаёт.
+
+    Результат проверки запоминается в процессе на
+    DATABASE_REPLICA_CHECK_INTERVAL секунд.
+    """
+    now = time.monotonic()
+    checked = health.get(alias)
+    if checked is not None and checked[1] > now:
+        return checked[0]
+    with health_lock:
+        checked = health.get(alias)
+        if checked is not None and checked[1] > now:
+            return checked[0]
+        try:
+            lag = replica_lag(alias)
+            healthy = lag <= settings.DATABASE_REPLICA_MAX_LAG
+            if not healthy:
+                logger.warning("Реплика %s отстаёт на %.1f с", alias, lag)
+        except DatabaseError:
+            logger.warning("Реплика %s недоступна", alias, exc_info=True)
+            healthy = False
+        health[alias] = (
+            healthy,
+            now + settings.DATABASE_REPLICA_CHECK_INTERVAL,
+        )
+        return healthy
+
+
+def choose_replica():
+    """Следующая по кругу исправная реплика или None."""
+    global replica_cycle
+    replicas = settings.DATABASE_REPLICAS
+    if replica_cycle is None:
+        replica_cycle = itertools.cycle(replicas)
+    for _ in range(len(replicas)):
+        alias = next(replica_cycle)
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        route = current_route.get()
+        if route is None or route.replica is None:
+            return DEFAULT_DB_ALIAS
+        return route.replica
+
+    def db_for_write(self, model, **hints):
+        route = current_route.get()
+        if route is not None:
+            # Запрос что-то записал — дальше читает свои записи
+            # с основной базы.
+            route.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -27,6 +27,8 @@ ALLOWED_HOSTS = [
     "localhost",
     "192.168.0.42",
     "sitegw",
+    "backend",
+    "api",
     "158.160.10.187",
 ]
 
@@ -40,12 +42,18 @@ INSTALLED_APPS = [
     "api",
     "users",
     "recipes",
+    "jobs",
+    "events",
     "djoser",
     "rest_framework",
     "rest_framework.authtoken",
 ]
 
 MIDDLEWARE = [
+    "api.middleware.ReplicaMiddleware",
+    "api.middleware.AnonymousCacheMiddleware",
+    "api.middleware.PrometheusMiddleware",
+    "api.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -77,6 +85,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
+# Асинхронные представления каталога и выгрузки списка покупок.
+# Включаются автоматически при запуске через foodgram.asgi.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", default="False").lower() == "true"
+
 
 DATABASES = {
     "default": {
@@ -91,6 +103,38 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения (foodgram/routers.py). DB_REPLICA_HOSTS — хосты
+# через запятую, при необходимости с портом (host:port), остальные
+# параметры подключения как у основной базы.
+DATABASE_REPLICAS = []
+for number, replica_host in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", default="").split(",")),
+    start=1,
+):
+    replica_host, _, replica_port = replica_host.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "OPTIONS": {"connect_timeout": 2},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["foodgram.routers.ReplicaRouter"]
+# Сколько секунд после изменения клиент читает с основной базы.
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.getenv("DATABASE_REPLICA_PIN_SECONDS", default=10)
+)
+DATABASE_REPLICA_PIN_COOKIE = "db_primary"
+# Реплика с большим отставанием (в секундах) считается неисправной.
+DATABASE_REPLICA_MAX_LAG = float(
+    os.getenv("DATABASE_REPLICA_MAX_LAG", default=5)
+)
+DATABASE_REPLICA_CHECK_INTERVAL = float(
+    os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", default=5)
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,6 +158,15 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "SEARCH_PARAM": "name",
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
@@ -148,3 +201,141 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.MyUser"
+
+INSTRUMENTATION_ENABLED = (
+    os.getenv("INSTRUMENTATION_ENABLED", default="False").lower() == "true"
+)
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = int(
+    os.getenv("INSTRUMENTATION_N_PLUS_ONE_THRESHOLD", default=5)
+)
+
+METRICS_ENABLED = (
+    os.getenv("METRICS_ENABLED", default="True").lower() == "true"
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.instrumentation": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+TRENDING_WINDOW_DAYS = int(os.getenv("TRENDING_WINDOW_DAYS", default=7))
+TRENDING_HALF_LIFE_HOURS = float(
+    os.getenv("TRENDING_HALF_LIFE_HOURS", default=48)
+)
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+
+# Кеши каталога и карточек рецептов в памяти воркера (api/local_cache.py).
+# Изменения сбрасывают кеш только в своём процессе, остальные воркеры
+# увидят их по истечении LOCAL_CACHE_TTL секунд.
+LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", default=60))
+LOCAL_CACHE_CATALOGUE_MAX_BYTES = int(
+    os.getenv("LOCAL_CACHE_CATALOGUE_MAX_BYTES", default=16 * 1024 * 1024)
+)
+LOCAL_CACHE_RECIPES_MAX_BYTES = int(
+    os.getenv("LOCAL_CACHE_RECIPES_MAX_BYTES", default=8 * 1024 * 1024)
+)
+# Счётчики фильтров ленты для анонимных клиентов (api/facets.py) живут
+# меньше: они меняются с каждым новым рецептом.
+LOCAL_CACHE_FACETS_TTL = int(os.getenv("LOCAL_CACHE_FACETS_TTL", default=30))
+LOCAL_CACHE_FACETS_MAX_BYTES = int(
+    os.getenv("LOCAL_CACHE_FACETS_MAX_BYTES", default=1024 * 1024)
+)
+
+# Снимок каталога тегов и ингредиентов, общий для воркеров (api/catalogue.py).
+# Пустое значение отключает снимок, тогда каталог кешируется в каждом
+# воркере отдельно.
+CATALOGUE_SNAPSHOT_PATH = os.getenv(
+    "CATALOGUE_SNAPSHOT_PATH",
+    default=os.path.join(BASE_DIR, "snapshot", "catalogue.bin"),
+)
+
+# Очередь фоновых задач (jobs/queue.py). С JOBS_EAGER задачи выполняются
+# сразу при постановке, без воркера run_jobs.
+JOBS_EAGER = os.getenv("JOBS_EAGER", default="False").lower() == "true"
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", default=3))
+JOBS_RETRY_BACKOFF = int(os.getenv("JOBS_RETRY_BACKOFF", default=10))
+JOBS_RETRY_BACKOFF_MAX = int(os.getenv("JOBS_RETRY_BACKOFF_MAX", default=600))
+JOBS_VISIBILITY_TIMEOUT = int(
+    os.getenv("JOBS_VISIBILITY_TIMEOUT", default=600)
+)
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", default=1))
+JOBS_WORKER_PROCESSES = int(os.getenv("JOBS_WORKER_PROCESSES", default=1))
+
+# Выгрузки списка покупок в PDF и HTML (recipes/shopping_list.py).
+# Файлы называются по хешу содержимого и не удаляются при изменении
+# списка, старые удаляет команда clean_shopping_lists. Если задан
+# SHOPPING_LIST_ACCEL_REDIRECT, файл отдаёт nginx из internal-location
+# с этим префиксом.
+SHOPPING_LIST_EXPORT_ROOT = os.getenv(
+    "SHOPPING_LIST_EXPORT_ROOT", default=os.path.join(BASE_DIR, "exports")
+)
+SHOPPING_LIST_ACCEL_REDIRECT = os.getenv(
+    "SHOPPING_LIST_ACCEL_REDIRECT", default=""
+)
+SHOPPING_LIST_FONT = os.getenv(
+    "SHOPPING_LIST_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+# Списки админки без фильтров не считают строки через COUNT(*), если
+# по статистике PostgreSQL в таблице больше строк (users/pagination.py).
+ADMIN_EXACT_COUNT_LIMIT = int(
+    os.getenv("ADMIN_EXACT_COUNT_LIMIT", default=10000)
+)
+
+# Фильтр рецептов по тегам перечисляет подходящие маски тегов
+# (recipes/tag_mask.py), пока тегов не больше TAGS_MASK_IN_LIST_BITS:
+# список из 2 ** n значений обслуживает индекс. Для большего числа
+# тегов маска проверяется побитовым И.
+TAGS_MASK_IN_LIST_BITS = int(
+    os.getenv("TAGS_MASK_IN_LIST_BITS", default=8)
+)
+
+# Поток событий о рецептах авторов из подписок (events/asgi.py), работает
+# только под ASGI. EVENTS_BACKEND доставляет события подключённым клиентам:
+# events.broker.DatabaseBackend опрашивает журнал раз в
+# EVENTS_POLL_INTERVAL секунд и видит события всех процессов,
+# events.broker.LocalBackend — только своего процесса. Транзакции
+# фиксируются не в порядке id, поэтому пропуски в id журнала
+# перечитываются ещё EVENTS_GAP_TIMEOUT секунд.
+EVENTS_PATH = os.getenv("EVENTS_PATH", default="/api/events/")
+EVENTS_BACKEND = os.getenv(
+    "EVENTS_BACKEND", default="events.broker.DatabaseBackend"
+)
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", default=1))
+EVENTS_GAP_TIMEOUT = float(os.getenv("EVENTS_GAP_TIMEOUT", default=10))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", default=15))
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", default=3000))
+EVENTS_REPLAY_LIMIT = int(os.getenv("EVENTS_REPLAY_LIMIT", default=100))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", default=100))
+
+# Наибольшее число объектов в пакетном запросе ?ids= (api/batch.py).
+API_BATCH_MAX_IDS = int(os.getenv("API_BATCH_MAX_IDS", default=100))
+
+# Публичные списки API для анонимных клиентов кешируются на
+# API_ANONYMOUS_CACHE_SECONDS секунд (микрокеш nginx,
+# api.middleware.AnonymousCacheMiddleware). Ещё API_ANONYMOUS_CACHE_STALE
+# секунд nginx может отдавать устаревший ответ, пока обновляет его.
+# 0 отключает заголовки кеширования.
+API_ANONYMOUS_CACHE_SECONDS = int(
+    os.getenv("API_ANONYMOUS_CACHE_SECONDS", default=5)
+)
+API_ANONYMOUS_CACHE_STALE = int(
+    os.getenv("API_ANONYMOUS_CACHE_STALE", default=30)
+)
+API_ANONYMOUS_CACHE_PATHS = (
+    "/api/recipes/",
+    "/api/tags/",
+    "/api/ingredients/",
+)
@@ -0,0 +1,46 @@
+"""Профиль настроек для воркеров, которые обслуживают только /api/.
+
+API работает с TokenAuthentication, поэтому сессии, сообщения, CSRF,
+защита от clickjacking, админка и шаблоны ему не нужны. Без них воркер
+импортирует меньше модулей и быстрее запускается. Админка и collectstatic
+по-прежнему работают с foodgram.settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+API_EXCLUDED_APPS = (
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+)
+
+API_EXCLUDED_MIDDLEWARE = (
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS
+]
+
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if middleware not in API_EXCLUDED_MIDDLEWARE
+]
+
+ROOT_URLCONF = "foodgram.urls_api"
+
+TEMPLATES = []
+
+# Browsable API требует шаблонов и сессий, API отдаёт только JSON.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+    ],
+}
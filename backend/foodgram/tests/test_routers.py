@@ -0,0 +1,77 @@
+import threading
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.middleware import ReplicaMiddleware
+from foodgram.routers import ReplicaRouter, Route, current_route
+
+REPLICA = "replica1"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        token = current_route.set(None)
+        self.addCleanup(current_route.reset, token)
+
+    def test_reads_primary_outside_request(self):
+        self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_reads_replica_until_first_write(self):
+        current_route.set(Route(REPLICA))
+        self.assertEqual(self.router.db_for_read(None), REPLICA)
+        self.assertEqual(self.router.db_for_write(None), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_route_is_not_shared_between_threads(self):
+        current_route.set(Route(REPLICA))
+        seen = []
+        thread = threading.Thread(
+            target=lambda: seen.append(self.router.db_for_read(None))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [DEFAULT_DB_ALIAS])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(self.router.allow_migrate(REPLICA, "recipes"), False)
+        self.assertIsNone(
+            self.router.allow_migrate(DEFAULT_DB_ALIAS, "recipes")
+        )
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+@mock.patch("foodgram.routers.is_healthy", return_value=True)
+class ReplicaMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.routes = []
+
+    def view(self, request):
+        self.routes.append(current_route.get().replica)
+        return HttpResponse()
+
+    def test_safe_request_reads_replica(self, is_healthy):
+        ReplicaMiddleware(self.view)(self.factory.get("/api/recipes/"))
+        self.assertEqual(self.routes, [REPLICA])
+        self.assertIsNone(current_route.get())
+
+    def test_write_pins_client_to_primary(self, is_healthy):
+        middleware = ReplicaMiddleware(self.view)
+        response = middleware(self.factory.post("/api/recipes/"))
+        self.assertEqual(self.routes, [None])
+        cookie = response.cookies["db_primary"]
+
+        request = self.factory.get("/api/recipes/")
+        request.COOKIES[cookie.key] = cookie.value
+        middleware(request)
+        self.assertEqual(self.routes, [None, None])
+
+    def test_unhealthy_replica_falls_back_to_primary(self, is_healthy):
+        is_healthy.return_value = False
+        ReplicaMiddleware(self.view)(self.factory.get("/api/recipes/"))
+        self.assertEqual(self.routes, [None])
@@ -1,3 +1,5 @@
+from api.metrics import metrics_view
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
@@ -5,3 +7,6 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics', metrics_view, name='metrics'))
@@ -0,0 +1,10 @@
+from api.metrics import metrics_view
+from django.conf import settings
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/', include('api.urls')),
+]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics', metrics_view, name='metrics'))
@@ -0,0 +1,103 @@
+import math
+import os
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() == "true"
+
+
+def available_cpus():
+    """Число процессоров с учётом ограничений контейнера.
+
+    cpu_count() видит все ядра хоста, поэтому сначала читается квота
+    cgroup v2 (cpu.max), затем маска процессоров, доступных процессу.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+bind = os.getenv("GUNICORN_BIND", "0:8000")
+
+# gthread — WSGI с потоками внутри воркера,
+# uvicorn.workers.UvicornWorker — ASGI-режим с асинхронными представлениями.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+wsgi_app = (
+    "foodgram.asgi:application"
+    if worker_class.startswith("uvicorn")
+    else "foodgram.wsgi:application"
+)
+
+cpus = available_cpus()
+if worker_class == "gthread":
+    workers = env_int("GUNICORN_WORKERS", cpus + 1)
+    threads = env_int("GUNICORN_THREADS", 4)
+else:
+    workers = env_int("GUNICORN_WORKERS", cpus * 2 + 1)
+    threads = 1
+
+# Приложение загружается в мастер-процессе до fork, и воркеры делят
+# страницы памяти с кодом Django и зависимостями (copy-on-write).
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+
+# Перезапуск воркеров после N запросов ограничивает рост памяти,
+# разброс не даёт всем воркерам перезапуститься одновременно.
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+worker_tmp_dir = os.getenv("GUNICORN_WORKER_TMP_DIR", "/dev/shm")
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+access_log_format = (
+    'method=%(m)s path="%(U)s" query="%(q)s" status=%(s)s '
+    "bytes=%(B)s duration=%(L)s pid=%(p)s"
+)
+
+
+# С preload_app метрики создаются при загрузке приложения, ещё до
+# on_starting, поэтому каталог для них нужен уже при чтении конфигурации.
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    """Удаляет файлы метрик Prometheus, оставшиеся от прошлого запуска.
+
+    Файлы самого мастера, созданные при предзагрузке, сохраняются.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    own = f"_{os.getpid()}.db"
+    for name in os.listdir(directory):
+        if not name.endswith(own):
+            os.remove(os.path.join(directory, name))
+
+
+def post_fork(server, worker):
+    """Не даёт воркерам унаследовать соединения с базой от мастера."""
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def child_exit(server, worker):
+    """Убирает живые gauge-метрики завершившегося воркера."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,31 @@
+from django.contrib import admin
+from users.pagination import EstimatedCountPaginator
+
+from .models import Job
+from .queue import restart
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'attempts',
+        'user',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('restart_jobs',)
+
+    @admin.action(description='Перезапустить завершённые задачи')
+    def restart_jobs(self, request, queryset):
+        jobs = queryset.filter(status__in=(Job.SUCCEEDED, Job.FAILED))
+        for job in jobs:
+            restart(job)
+        self.message_user(request, f'Перезапущено задач: {len(jobs)}')
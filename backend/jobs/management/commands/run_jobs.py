@@ -0,0 +1,75 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import work
+
+stopping = False
+
+
+def stop(signum, frame):
+    global stopping
+    stopping = True
+
+
+def run_worker(poll_interval, burst):
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    return work(poll_interval, burst, should_stop=lambda: stopping)
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает воркеры фоновых задач. По SIGTERM воркеры дожидаются "
+        "окончания текущей задачи и завершаются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.JOBS_WORKER_PROCESSES,
+            help="Число процессов-воркеров",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, в секундах",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Завершиться, когда очередь опустеет",
+        )
+
+    def handle(self, *args, **options):
+        if options["processes"] <= 1:
+            processed = run_worker(options["poll_interval"], options["burst"])
+            self.stdout.write(f"Выполнено задач: {processed}")
+            return
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(options["poll_interval"], options["burst"]),
+            )
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+
+        def forward(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for process in processes:
+            process.join()
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Модель фоновой задачи.
+
+    Очередь хранится в базе: воркер run_jobs забирает задачи со статусом
+    pending, у которых наступило время run_at.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (SUCCEEDED, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(max_length=200, verbose_name="Задача")
+    kwargs = models.JSONField(default=dict, verbose_name="Аргументы")
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попыток"
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3, verbose_name="Максимум попыток"
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Запустить не раньше"
+    )
+    idempotency_key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Ключ идемпотентности",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="jobs",
+        verbose_name="Пользователь",
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name="Результат")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    worker = models.CharField(
+        max_length=100, blank=True, verbose_name="Воркер"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Создана"
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Начата"
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Завершена"
+    )
+
+    class Meta:
+        ordering = ("-created_at",)
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=("status", "run_at"), name="job_queue_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}: {self.get_status_display()}"
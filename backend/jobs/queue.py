@@ -0,0 +1,225 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, зарегистрированная декоратором task. Вызов enqueue
+создаёт запись Job, воркер run_jobs забирает её условным UPDATE, поэтому
+очередь работает на любой базе без блокировок строк и внешнего брокера.
+Упавшая задача повторяется с экспоненциальной задержкой, а зависшая
+(воркер завершился посреди работы) снова становится доступной через
+JOBS_VISIBILITY_TIMEOUT секунд, пока не исчерпаны попытки. С JOBS_EAGER
+задачи выполняются сразу в вызывающем процессе.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger("jobs")
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, **kwargs):
+        return enqueue(self.name, **kwargs)
+
+
+def task(name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи и её результат должны сериализоваться в JSON.
+    """
+
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        registry[task_name] = Task(
+            func, task_name, max_attempts or settings.JOBS_MAX_ATTEMPTS
+        )
+        return registry[task_name]
+
+    return decorator
+
+
+def enqueue(name, kwargs=None, user=None, idempotency_key=None, run_at=None):
+    """Ставит задачу в очередь и возвращает её Job.
+
+    Повторный вызов с тем же idempotency_key возвращает уже созданную
+    задачу, не создавая новую.
+    """
+    if name not in registry:
+        raise LookupError(f"Неизвестная задача {name}")
+    if idempotency_key:
+        job = Job.objects.filter(idempotency_key=idempotency_key).first()
+        if job is not None:
+            return job
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                name=name,
+                kwargs=kwargs or {},
+                user=user,
+                idempotency_key=idempotency_key,
+                run_at=run_at or timezone.now(),
+                max_attempts=registry[name].max_attempts,
+            )
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+    if settings.JOBS_EAGER:
+        run_eagerly(job)
+    return job
+
+
+def restart(job):
+    """Снова ставит в очередь завершённую задачу с тем же ключом."""
+    job.status = Job.PENDING
+    job.attempts = 0
+    job.run_at = timezone.now()
+    job.result = None
+    job.error = ""
+    job.started_at = job.finished_at = None
+    job.save()
+    if settings.JOBS_EAGER:
+        run_eagerly(job)
+    return job
+
+
+def run_eagerly(job):
+    while job.status == Job.PENDING:
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        run_job(job)
+
+
+def backoff(attempt):
+    """Задержка перед повтором попытки attempt, в секундах."""
+    delay = min(
+        settings.JOBS_RETRY_BACKOFF * 2 ** (attempt - 1),
+        settings.JOBS_RETRY_BACKOFF_MAX,
+    )
+    return delay + random.uniform(0, settings.JOBS_RETRY_BACKOFF)
+
+
+def fail_stale_jobs(now, stale):
+    """Помечает упавшими зависшие задачи, у которых кончились попытки.
+
+    Такая задача обычно сама роняет воркер (например, по памяти)
+    и не доходит до обработки ошибки в run_job.
+    """
+    failed = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=stale,
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.FAILED,
+        finished_at=now,
+        error=(
+            "Воркер не завершил задачу за JOBS_VISIBILITY_TIMEOUT секунд, "
+            "попытки исчерпаны"
+        ),
+    )
+    if failed:
+        logger.error("Зависших задач без попыток: %s", failed)
+    return failed
+
+
+def claim_job(worker):
+    """Забирает первую готовую задачу и помечает её выполняемой."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT)
+    fail_stale_jobs(now, stale)
+    available = Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING,
+        started_at__lt=stale,
+        attempts__lt=F("max_attempts"),
+    )
+    candidates = (
+        Job.objects.filter(available)
+        .order_by("run_at", "id")
+        .values_list("id", flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = (
+            Job.objects.filter(available, pk=pk).update(
+                status=Job.RUNNING,
+                started_at=now,
+                worker=worker,
+                attempts=F("attempts") + 1,
+            )
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Выполняет задачу и сохраняет результат или планирует повтор."""
+    task = registry.get(job.name)
+    start = time.perf_counter()
+    try:
+        if task is None:
+            raise LookupError(f"Неизвестная задача {job.name}")
+        result = task(**job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        if task is not None and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        logger.exception(
+            "Задача %s #%s, попытка %s", job.name, job.pk, job.attempts
+        )
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        logger.info(
+            "Задача %s #%s выполнена за %.2f с",
+            job.name,
+            job.pk,
+            time.perf_counter() - start,
+        )
+    job.save()
+
+
+def work(poll_interval, burst=False, should_stop=lambda: False):
+    """Цикл воркера: забирает и выполняет задачи до остановки.
+
+    С burst воркер завершается, когда очередь пуста. Возвращает число
+    выполненных задач.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    while not should_stop():
+        close_old_connections()
+        job = claim_job(worker)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
@@ -1,36 +1,123 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils.html import format_html
+from users.pagination import EstimatedCountPaginator
 
+from .models import Favorite, Recipe, Ingredient, Tag, RecipeIngredient
 
-from .models import Recipe, Ingredient, Tag, RecipeIngredient
+
+def count_subquery(model, field):
+    """Число строк model, ссылающихся на объект через field.
+
+    Подзапрос выполняется только для строк текущей страницы, в отличие
+    от Count с JOIN и GROUP BY по всей таблице.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("*"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ("pk", "name", "color", "slug")
     empty_value_display = "<--пусто-->"
-    list_filter = (
-        "name",
-        "slug",
-    )
     search_fields = (
         "name",
         "slug",
     )
 
 
-@admin.register(RecipeIngredient)
+class SelectedAutocompleteSelect(AutocompleteSelect):
+    """AutocompleteSelect, которому подпись выбранного значения передаёт
+    форма, без отдельного запроса на каждую строку инлайна."""
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None or list(map(str, value)) != [
+            str(self.selected[0])
+        ]:
+            return super().optgroups(name, value, attr)
+        option_value, option_label = self.selected
+        option = self.create_option(name, option_value, option_label, True, 0)
+        return [(None, [option], 0)]
+
+
+class IngredientInRecipeForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            widget = self.fields["ingredient"].widget
+            # RelatedFieldWidgetWrapper вокруг виджета автодополнения.
+            widget = getattr(widget, "widget", widget)
+            ingredient = self.instance.ingredient
+            widget.selected = (ingredient.pk, str(ingredient))
+
+
 class IngredientsInRecipeInline(admin.TabularInline):
-    model = Recipe.ingredients.through
+    model = RecipeIngredient
+    form = IngredientInRecipeForm
+    autocomplete_fields = ("ingredient",)
+    extra = 0
+
+    def get_queryset(self, request):
+        # Рецепт нужен для подписи строки (RecipeIngredient.__str__).
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("recipe", "ingredient")
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "ingredient":
+            kwargs["widget"] = SelectedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get("using")
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    inlines = [
-        IngredientsInRecipeInline,
-    ]
-    list_display = ("id", "name", "measurement_unit")
-    list_filter = ("name",)
+    list_display = ("id", "name", "measurement_unit", "count_recipes")
+    list_filter = ("measurement_unit",)
+    search_fields = ("^name",)
+    readonly_fields = ("count_recipes",)
     empty_value_display = "-empty-"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                recipes_count=count_subquery(RecipeIngredient, "ingredient")
+            )
+        )
+
+    @admin.display(description="Рецептов", ordering="recipes_count")
+    def count_recipes(self, obj):
+        # Рецептов с ингредиентом могут быть тысячи, поэтому вместо
+        # инлайна ссылка на постраничный список рецептов.
+        url = reverse("admin:recipes_recipe_changelist")
+        return format_html(
+            '<a href="{}?ingredients__id__exact={}">{}</a>',
+            url,
+            obj.pk,
+            obj.recipes_count,
+        )
 
 
 @admin.register(Recipe)
@@ -39,13 +126,24 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientsInRecipeInline,
     ]
     exclude = ("ingredients",)
-    list_display = ("id", "author", "name", "count_favorite")
-    list_filter = ("author", "name", "tags")
+    list_display = ("id", "author", "name", "pub_date", "count_favorite")
+    list_filter = ("tags",)
+    list_select_related = ("author",)
+    search_fields = ("name", "^author__username")
+    autocomplete_fields = ("author", "tags")
     empty_value_display = "-empty-"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     readonly_fields = ("count_favorite",)
 
-    def count_favorite(self, obj):
-        return obj.favorite.all().count()
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(favorite_count=count_subquery(Favorite, "recipe"))
+        )
 
-    count_favorite.short_description = "Избранных"
+    @admin.display(description="Избранных", ordering="favorite_count")
+    def count_favorite(self, obj):
+        return obj.favorite_count
@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from .models import Ingredient, Recipe, RecipeIngredient, Tag
+        from .tag_mask import recipe_tags_changed, tag_deleted
+        from .versions import (
+            author_changed,
+            ingredient_changed,
+            recipe_ingredient_changed,
+            tag_changed,
+        )
+
+        m2m_changed.connect(recipe_tags_changed, sender=Recipe.tags.through)
+        pre_delete.connect(tag_deleted, sender=Tag)
+        post_save.connect(tag_changed, sender=Tag)
+        post_save.connect(recipe_ingredient_changed, sender=RecipeIngredient)
+        post_delete.connect(
+            recipe_ingredient_changed, sender=RecipeIngredient
+        )
+        post_save.connect(ingredient_changed, sender=Ingredient)
+        post_save.connect(author_changed, sender=get_user_model())
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from recipes.tag_mask import backfill
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает маски тегов всех рецептов по таблице связей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число рецептов в одной пачке",
+        )
+
+    def handle(self, *args, **options):
+        count = backfill(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитаны маски тегов {count} рецептов")
+        )
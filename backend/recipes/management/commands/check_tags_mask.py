@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Recipe
+from recipes.tag_mask import compute_masks, iter_batches, save_masks
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет маски тегов рецептов с таблицей связей и падает, "
+        "если они расходятся"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число рецептов в одной пачке",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Исправить расходящиеся маски",
+        )
+
+    def handle(self, *args, **options):
+        mismatched = {}
+        for batch in iter_batches(options["batch_size"]):
+            stored = dict(
+                Recipe.objects.filter(id__in=batch).values_list(
+                    "id", "tags_mask"
+                )
+            )
+            for recipe_id, mask in compute_masks(batch).items():
+                if stored.get(recipe_id, mask) != mask:
+                    mismatched[recipe_id] = mask
+                    self.stdout.write(
+                        f"Рецепт {recipe_id}: маска {stored[recipe_id]}, "
+                        f"по тегам {mask}"
+                    )
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("Маски тегов совпадают"))
+            return
+        if options["fix"]:
+            save_masks(mismatched)
+            self.stdout.write(
+                self.style.SUCCESS(f"Исправлено масок: {len(mismatched)}")
+            )
+            return
+        raise CommandError(f"Расходящихся масок: {len(mismatched)}")
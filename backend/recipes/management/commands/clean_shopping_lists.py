@@ -0,0 +1,30 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Удаляет старые выгрузки списков покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Удалять файлы старше стольких часов",
+        )
+
+    def handle(self, *args, **options):
+        root = settings.SHOPPING_LIST_EXPORT_ROOT
+        if not os.path.isdir(root):
+            return
+        deadline = time.time() - options["hours"] * 3600
+        removed = 0
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < deadline:
+                    os.unlink(entry.path)
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(f"Удалено файлов: {removed}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from recipes.similarity import compute_similar
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает похожие рецепты по совместным добавлениям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=10,
+            help="Сколько похожих рецептов хранить для каждого рецепта",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Сколько рецептов обрабатывать за один шаг",
+        )
+
+    def handle(self, *args, **options):
+        count = compute_similar(
+            top_k=options["top_k"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Сохранено {count} пар похожих рецептов")
+        )
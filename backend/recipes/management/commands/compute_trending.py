@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.trending import compute_scores
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рейтинги популярности рецептов"
+
+    def handle(self, *args, **options):
+        count = compute_scores()
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитаны рейтинги {count} рецептов")
+        )
@@ -0,0 +1,206 @@
+import random
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShopingList,
+    Tag,
+)
+from recipes.tag_mask import save_masks
+from users.models import Follow, MyUser
+
+TAGS = (
+    {"name": "Завтрак", "color": "#E26C2D", "slug": "breakfast"},
+    {"name": "Обед", "color": "#00FF00", "slug": "lunch"},
+    {"name": "Ужин", "color": "#800080", "slug": "dinner"},
+)
+UNITS = ("г", "кг", "мл", "л", "шт", "ст. л.", "ч. л.", "по вкусу")
+WORDS = (
+    "суп", "салат", "пирог", "каша", "омлет", "рагу", "запеканка",
+    "курица", "говядина", "рыба", "грибы", "овощи", "сыр", "томаты",
+    "картофель", "рис", "гречка", "тыква", "яблоки", "ягоды",
+)
+
+
+class Command(BaseCommand):
+    help = "Генерирует синтетические данные для нагрузочных замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument("--follows-per-user", type=int, default=10)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--carts-per-user", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        with transaction.atomic():
+            tags = self.create_tags()
+            ingredients = self.create_ingredients(options["ingredients"])
+            users = self.create_users(options["users"])
+            recipes = self.create_recipes(
+                options["recipes"], users, tags, ingredients
+            )
+            self.create_follows(users, options["follows_per_user"])
+            self.create_pairs(
+                Favorite, users, recipes, options["favorites_per_user"]
+            )
+            self.create_pairs(
+                ShopingList, users, recipes, options["carts_per_user"]
+            )
+        # bulk_create не отправляет сигналы, снимок каталога
+        # пересобирается явно.
+        if settings.CATALOGUE_SNAPSHOT_PATH:
+            call_command("build_catalogue_snapshot", stdout=self.stdout)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: {len(users)} пользователей, "
+                f"{len(recipes)} рецептов"
+            )
+        )
+
+    def create_tags(self):
+        for tag_data in TAGS:
+            Tag.objects.get_or_create(slug=tag_data["slug"], defaults=tag_data)
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_ingredients(self, count):
+        existing = Ingredient.objects.count()
+        if existing < count:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(
+                        name=f"ингредиент {number}",
+                        measurement_unit=self.rng.choice(UNITS),
+                    )
+                    for number in range(existing, count)
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        return list(Ingredient.objects.values_list("id", flat=True))
+
+    def create_users(self, count):
+        last_id = MyUser.objects.order_by("-id").values_list(
+            "id", flat=True
+        ).first() or 0
+        password = make_password("bench-password")
+        MyUser.objects.bulk_create(
+            [
+                MyUser(
+                    username=f"bench_{last_id}_{number}",
+                    email=f"bench_{last_id}_{number}@example.com",
+                    first_name="Пользователь",
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        return list(
+            MyUser.objects.filter(id__gt=last_id).values_list("id", flat=True)
+        )
+
+    def create_recipes(self, count, users, tags, ingredients):
+        last_id = Recipe.objects.order_by("-id").values_list(
+            "id", flat=True
+        ).first() or 0
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author_id=self.rng.choice(users),
+                    name=" ".join(self.rng.sample(WORDS, 3)).capitalize(),
+                    text=" ".join(self.rng.choices(WORDS, k=60)),
+                    cooking_time=self.rng.randint(5, 180),
+                )
+                for _ in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        recipes = list(
+            Recipe.objects.filter(id__gt=last_id).values_list("id", flat=True)
+        )
+        bits = dict(Tag.objects.values_list("id", "bit"))
+        recipe_tags = []
+        # bulk_create не отправляет m2m_changed, маски считаются здесь же.
+        masks = {}
+        recipe_ingredients = []
+        for recipe_id in recipes:
+            tag_count = self.rng.randint(1, len(tags))
+            masks[recipe_id] = 0
+            for tag_id in self.rng.sample(tags, tag_count):
+                recipe_tags.append(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                )
+                masks[recipe_id] |= 1 << bits[tag_id]
+            lines = min(self.rng.randint(5, 30), len(ingredients))
+            for ingredient_id in self.rng.sample(ingredients, lines):
+                recipe_ingredients.append(
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.randint(1, 1000),
+                    )
+                )
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size
+        )
+        save_masks(masks, batch_size=self.batch_size)
+        RecipeIngredient.objects.bulk_create(
+            recipe_ingredients, batch_size=self.batch_size
+        )
+        return recipes
+
+    def popular(self, population):
+        """Перемешанная выборка с накопленными весами по закону Ципфа.
+
+        Небольшая часть авторов и рецептов собирает большую часть подписок
+        и добавлений, как на живом сайте.
+        """
+        population = list(population)
+        self.rng.shuffle(population)
+        weights = list(
+            accumulate(1 / rank for rank in range(1, len(population) + 1))
+        )
+        return population, weights
+
+    def pick(self, population, weights, count):
+        return set(self.rng.choices(population, cum_weights=weights, k=count))
+
+    def create_follows(self, users, per_user):
+        authors, weights = self.popular(users)
+        follows = []
+        for user_id in users:
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in self.pick(authors, weights, per_user)
+                if author_id != user_id
+            )
+        Follow.objects.bulk_create(
+            follows, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+    def create_pairs(self, model, users, recipes, per_user):
+        recipes, weights = self.popular(recipes)
+        model.objects.bulk_create(
+            [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in users
+                for recipe_id in self.pick(recipes, weights, per_user)
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
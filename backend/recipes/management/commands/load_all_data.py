@@ -1,21 +1,36 @@
-import json
+import hashlib
+
 from django.core.management import BaseCommand
-from recipes.models import Ingredient
+from jobs.queue import enqueue
+from recipes.tasks import import_ingredients
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        with open("/app/data/ingredients.json", "r", encoding="utf-8") as file:
-            data = json.load(file)
-            for item in data:
-                ingredient = Ingredient.objects.create(
-                    name=item["name"],
-                    measurement_unit=item["measurement_unit"],
-                )
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"Successfully created ingredient {ingredient.name}"
-                    )
-                )
+    help = "Загружает ингредиенты из JSON-файла"
 
-                # /app/data/ingredients.json'
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/app/data/ingredients.json")
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Поставить загрузку в очередь фоновых задач",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["background"]:
+            with open(path, "rb") as file:
+                digest = hashlib.sha256(file.read()).hexdigest()
+            job = enqueue(
+                import_ingredients.name,
+                kwargs={"path": path},
+                idempotency_key=f"import_ingredients:{digest}",
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Задача #{job.pk}: {job.status}")
+            )
+            return
+        result = import_ingredients(path=path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Загружено ингредиентов: {result['created']}")
+        )
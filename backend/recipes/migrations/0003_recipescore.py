@@ -0,0 +1,32 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shopinglist',
+            name='date_add',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления'),
+        ),
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(db_index=True, default=0, verbose_name='Рейтинг популярности')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Время пересчёта')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:37
+
+from django.db import migrations, models
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to=recipes.models.recipe_image_path, verbose_name='Картинка рецепта'),
+        ),
+    ]
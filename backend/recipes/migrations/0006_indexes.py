@@ -0,0 +1,36 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import foodgram.indexes
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, без блокировки записи в таблицы.
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_content_hash'),
+    ]
+
+    operations = [
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='favorite',
+            index=models.Index(fields=['date_added'], name='favorite_date_added_idx'),
+        ),
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='ingredient',
+            index=foodgram.indexes.PrefixSearchIndex('name', name='ingredient_name_prefix_idx'),
+        ),
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ),
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='shopinglist',
+            index=models.Index(fields=['date_add'], name='cart_date_add_idx'),
+        ),
+    ]
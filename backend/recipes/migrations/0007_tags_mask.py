@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def assign_bits(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    with transaction.atomic():
+        for bit, tag in enumerate(Tag.objects.order_by('id')):
+            tag.bit = bit
+            tag.save(update_fields=['bit'])
+
+
+def backfill_masks(apps, schema_editor):
+    """Маски пачками по BATCH_SIZE рецептов, каждая пачка в своей
+    транзакции, чтобы не держать блокировки всей таблицы."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTags = Recipe.tags.through
+    last_id = 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        masks = dict.fromkeys(batch, 0)
+        rows = RecipeTags.objects.filter(recipe_id__in=batch).values_list(
+            'recipe_id', 'tag__bit'
+        )
+        for recipe_id, bit in rows:
+            masks[recipe_id] |= 1 << bit
+        by_mask = defaultdict(list)
+        for recipe_id, mask in masks.items():
+            by_mask[mask].append(recipe_id)
+        with transaction.atomic():
+            for mask, recipe_ids in by_mask.items():
+                Recipe.objects.filter(id__in=recipe_ids).update(
+                    tags_mask=mask
+                )
+        last_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Бит в маске тегов рецепта'),
+        ),
+        migrations.RunPython(assign_bits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True, verbose_name='Бит в маске тегов рецепта'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Сумма 2 ** Tag.bit по тегам рецепта', verbose_name='Маска тегов'),
+        ),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import foodgram.indexes
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0007_tags_mask'),
+    ]
+
+    operations = [
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['tags_mask', '-pub_date'], name='recipe_tags_mask_idx'),
+        ),
+    ]
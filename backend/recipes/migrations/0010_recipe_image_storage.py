@@ -0,0 +1,20 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:23
+
+from django.db import migrations, models
+import recipes.models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=recipes.storage.ContentHashStorage(), upload_to=recipes.models.recipe_image_path, verbose_name='Картинка рецепта'),
+        ),
+    ]
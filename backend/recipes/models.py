@@ -1,8 +1,32 @@
+import hashlib
+import os
+
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import DateTimeField
+from foodgram.indexes import PrefixSearchIndex
 from users.models import MyUser
 
+from .storage import ContentHashStorage
+
+
+# Маска тегов рецепта хранится в знаковом BigIntegerField.
+TAG_MASK_BITS = 63
+
+
+def recipe_image_path(instance, filename):
+    """Имя картинки рецепта по хешу содержимого.
+
+    Файл с таким именем никогда не меняется, поэтому nginx отдаёт
+    картинки с заголовком Cache-Control: immutable, а одинаковые картинки
+    хранятся одним файлом (ContentHashStorage).
+    """
+    digest = hashlib.sha256()
+    for chunk in instance.image.file.chunks():
+        digest.update(chunk)
+    extension = os.path.splitext(filename)[1].lower()
+    return f"recipes/{digest.hexdigest()[:32]}{extension}"
+
 
 class Ingredient(models.Model):
     """Модель ингредиентов"""
@@ -26,6 +50,9 @@ class Ingredient(models.Model):
                 name="ingredient_name_unit_unique",
             )
         ]
+        indexes = [
+            PrefixSearchIndex("name", name="ingredient_name_prefix_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.measurement_unit}."
@@ -49,6 +76,11 @@ class Tag(models.Model):
         verbose_name="Уникальный слаг",
         unique=True,
     )
+    bit = models.PositiveSmallIntegerField(
+        verbose_name="Бит в маске тегов рецепта",
+        unique=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = ["name"]
@@ -58,6 +90,17 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(Tag.objects.values_list("bit", flat=True))
+            free = [bit for bit in range(TAG_MASK_BITS) if bit not in used]
+            if not free:
+                raise ValueError(
+                    f"Тегов не может быть больше {TAG_MASK_BITS}"
+                )
+            self.bit = free[0]
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     """Модель рецептов"""
@@ -71,7 +114,8 @@ class Recipe(models.Model):
     name = models.CharField(max_length=200, verbose_name="Название")
     text = models.TextField(verbose_name="Описание")
     image = models.ImageField(
-        upload_to="recipes/",
+        upload_to=recipe_image_path,
+        storage=ContentHashStorage(),
         verbose_name="Картинка рецепта",
         blank=True,
         null=True,
@@ -86,17 +130,39 @@ class Recipe(models.Model):
         verbose_name="Время публикации",
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Время изменения",
+        auto_now=True,
+        help_text="Меняется и при изменении ингредиентов и тегов рецепта",
+    )
     ingredients = models.ManyToManyField(
         Ingredient, through="RecipeIngredient"
     )
     tags = models.ManyToManyField(
         Tag, verbose_name="Тэги", related_name="recipes"
     )
+    tags_mask = models.BigIntegerField(
+        verbose_name="Маска тегов",
+        default=0,
+        editable=False,
+        help_text="Сумма 2 ** Tag.bit по тегам рецепта",
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=("-pub_date",), name="recipe_pub_date_idx"),
+            models.Index(
+                fields=("author", "-pub_date"),
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=("tags_mask", "-pub_date"),
+                name="recipe_tags_mask_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -167,6 +233,11 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные"
+        indexes = [
+            models.Index(
+                fields=("date_added",), name="favorite_date_added_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "recipe"], name="unique_favorite_recipe"
@@ -194,10 +265,16 @@ class ShopingList(models.Model):
         related_name="cart",
         verbose_name="Список покупок",
     )
+    date_add = DateTimeField(
+        verbose_name="Дата добавления", auto_now_add=True
+    )
 
     class Meta:
         verbose_name = "Список покупок"
         verbose_name_plural = "Список покупок"
+        indexes = [
+            models.Index(fields=("date_add",), name="cart_date_add_idx"),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "recipe"], name="unique_list_recipe"
@@ -209,3 +286,70 @@ class ShopingList(models.Model):
             f"Пользователь: {self.user}"
             f" добавил в cписок покупок: {self.recipe}"
         )
+
+
+class RecipeScore(models.Model):
+    """Модель рейтинга популярности рецепта.
+
+    Значение пересчитывается командой compute_trending и между пересчётами
+    увеличивается при добавлении рецепта в избранное или список покупок.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="score",
+        verbose_name="Рецепт",
+    )
+    value = models.FloatField(
+        verbose_name="Рейтинг популярности",
+        default=0,
+        db_index=True,
+    )
+    computed_at = DateTimeField(
+        verbose_name="Время пересчёта", auto_now=True
+    )
+
+    class Meta:
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинги рецептов"
+
+    def __str__(self):
+        return f"Рецепт: {self.recipe}, рейтинг: {self.value:.2f}"
+
+
+class SimilarRecipe(models.Model):
+    """Модель похожих рецептов.
+
+    Заполняется командой compute_similar_recipes по совместным добавлениям
+    рецептов в избранное и список покупок.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_recipes",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField(verbose_name="Сходство")
+    rank = models.PositiveSmallIntegerField(verbose_name="Позиция")
+
+    class Meta:
+        ordering = ("recipe", "rank")
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "rank"),
+                name="unique_similar_recipe_rank",
+            )
+        ]
+
+    def __str__(self):
+        return f"Рецепт: {self.recipe}, похожий: {self.similar}"
@@ -0,0 +1,161 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils.html import format_html, format_html_join
+
+from .models import RecipeIngredient
+
+SHOPPING_LIST_TITLE = "Список покупок"
+PDF_FONT = "ShoppingListFont"
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td {{ border-bottom: 1px solid #ccc; padding: 0.4em; }}
+td:last-child {{ text-align: right; white-space: nowrap; }}
+@media print {{ body {{ margin: 0; }} }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<table>
+{items}
+</table>
+</body>
+</html>
+"""
+
+
+def shopping_list_queryset(user):
+    """Суммарные количества ингредиентов из списка покупок пользователя.
+
+    Кортежи (название, единица измерения, количество), отсортированные
+    по названию, одним агрегирующим запросом.
+    """
+    return (
+        RecipeIngredient.objects.filter(recipe__cart__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(amount=Sum("amount"))
+        .order_by("ingredient__name")
+        .values_list(
+            "ingredient__name", "ingredient__measurement_unit", "amount"
+        )
+    )
+
+
+def get_shopping_list(user):
+    return list(shopping_list_queryset(user))
+
+
+def shopping_list_lines(rows):
+    """Строки текстового файла списка покупок."""
+    yield f"{SHOPPING_LIST_TITLE}:\n\n"
+    for name, measurement_unit, amount in rows:
+        yield f"{name}, {amount} {measurement_unit}\n"
+
+
+# Версия оформления выгрузок входит в хеш: после её изменения старые
+# файлы перестают совпадать и создаются заново.
+EXPORT_VERSION = 1
+EXPORT_TYPES = {
+    "pdf": "application/pdf",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def shopping_list_hash(rows):
+    """Хеш содержимого списка покупок, имя файла выгрузки."""
+    data = json.dumps([EXPORT_VERSION, rows], ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def export_path(digest, export_type):
+    return os.path.join(
+        settings.SHOPPING_LIST_EXPORT_ROOT, f"{digest}.{export_type}"
+    )
+
+
+def render_html(rows):
+    """Список покупок страницей для печати."""
+    items = format_html_join(
+        "\n",
+        "<tr><td>{0}</td><td>{2} {1}</td></tr>",
+        rows,
+    )
+    return format_html(
+        HTML_TEMPLATE, title=SHOPPING_LIST_TITLE, items=items
+    ).encode()
+
+
+def render_pdf(rows):
+    """Список покупок в PDF со встроенным шрифтом с кириллицей."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT, settings.SHOPPING_LIST_FONT)
+        )
+    buffer = io.BytesIO()
+    # invariant убирает из файла дату создания и случайный идентификатор.
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    pdf.setTitle(SHOPPING_LIST_TITLE)
+    width, height = A4
+    margin = 20 * mm
+    line_height = 7 * mm
+    top = height - margin
+
+    pdf.setFont(PDF_FONT, 16)
+    pdf.drawString(margin, top, SHOPPING_LIST_TITLE)
+    y = top - 2 * line_height
+    for name, measurement_unit, amount in rows:
+        text = f"☐ {name} — {amount} {measurement_unit}"
+        for line in simpleSplit(text, PDF_FONT, 12, width - 2 * margin):
+            if y < margin:
+                pdf.showPage()
+                y = top
+            pdf.setFont(PDF_FONT, 12)
+            pdf.drawString(margin, y, line)
+            y -= line_height
+    pdf.save()
+    return buffer.getvalue()
+
+
+RENDERERS = {"pdf": render_pdf, "html": render_html}
+
+
+def write_export(rows, export_type):
+    """Создаёт файл выгрузки, если его ещё нет, и возвращает путь.
+
+    Файл пишется во временный и переименовывается, поэтому nginx
+    не отдаст недописанную выгрузку.
+    """
+    path = export_path(shopping_list_hash(rows), export_type)
+    if os.path.exists(path):
+        return path
+    data = RENDERERS[export_type](rows)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
@@ -0,0 +1,141 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+from users.models import MyUser
+
+from .models import Favorite, Recipe, SimilarRecipe, ShopingList
+
+
+def iter_user_batches(batch_size):
+    """id пользователей пачками по batch_size в порядке id."""
+    last_id = 0
+    while True:
+        batch = list(
+            MyUser.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def match_ids(ids, values):
+    """Позиции values в отсортированном массиве ids, -1 для отсутствующих."""
+    values = np.array(values, dtype=np.int64)
+    positions = np.searchsorted(ids, values)
+    found = positions < len(ids)
+    found[found] = ids[positions[found]] == values[found]
+    return np.where(found, positions, -1)
+
+
+def build_matrix(batch_size=5000):
+    """Строит разреженную матрицу пользователь x рецепт.
+
+    Добавление в избранное и в список покупок учитываются с весами
+    TRENDING_FAVORITE_WEIGHT и TRENDING_CART_WEIGHT. Матрица собирается
+    из блоков строк по batch_size пользователей: списки Python держат
+    только взаимодействия одной пачки, но сама матрица хранит все
+    взаимодействия (около 8 байт на каждое).
+    Возвращает матрицу и массив id рецептов, соответствующих столбцам.
+    """
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by("id").values_list("id", flat=True).iterator(),
+        dtype=np.int64,
+    )
+    blocks = []
+    for batch in iter_user_batches(batch_size):
+        user_ids = np.array(batch, dtype=np.int64)
+        users, recipes, weights = [], [], []
+        for model, weight in (
+            (Favorite, settings.TRENDING_FAVORITE_WEIGHT),
+            (ShopingList, settings.TRENDING_CART_WEIGHT),
+        ):
+            for user_id, recipe_id in (
+                model.objects.filter(
+                    user_id__gte=batch[0], user_id__lte=batch[-1]
+                )
+                .order_by()
+                .values_list("user_id", "recipe_id")
+            ):
+                users.append(user_id)
+                recipes.append(recipe_id)
+                weights.append(weight)
+        rows = match_ids(user_ids, users)
+        cols = match_ids(recipe_ids, recipes)
+        # Рецепты и пользователи, появившиеся после чтения id,
+        # в матрицу не попадают.
+        known = (rows >= 0) & (cols >= 0)
+        blocks.append(
+            sparse.csr_matrix(
+                (
+                    np.array(weights, dtype=np.float32)[known],
+                    (rows[known], cols[known]),
+                ),
+                shape=(len(user_ids), len(recipe_ids)),
+            )
+        )
+    if not blocks:
+        return sparse.csr_matrix((0, len(recipe_ids))), recipe_ids
+    return sparse.vstack(blocks, format="csr"), recipe_ids
+
+
+def normalize_columns(matrix):
+    """Нормирует столбцы матрицы, чтобы произведение давало косинусы."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    return (matrix @ sparse.diags(1 / norms)).tocsc()
+
+
+def iter_similar(matrix, recipe_ids, top_k, chunk_size):
+    """Выдаёт объекты SimilarRecipe, обрабатывая рецепты порциями.
+
+    Для порции из chunk_size рецептов считается блок сходств
+    chunk_size x число рецептов, поэтому сверх самой матрицы память
+    растёт с размером порции, а не с квадратом числа рецептов.
+    """
+    normalized = normalize_columns(matrix)
+    transposed = normalized.T.tocsr()
+    for start in range(0, len(recipe_ids), chunk_size):
+        block = (transposed[start:start + chunk_size] @ normalized).tocsr()
+        for offset in range(block.shape[0]):
+            column = start + offset
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            scores = block.data[begin:end]
+            neighbours = block.indices[begin:end]
+            keep = neighbours != column
+            scores, neighbours = scores[keep], neighbours[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                scores, neighbours = scores[best], neighbours[best]
+            order = np.argsort(-scores, kind="stable")
+            for rank, index in enumerate(order, start=1):
+                yield SimilarRecipe(
+                    recipe_id=int(recipe_ids[column]),
+                    similar_id=int(recipe_ids[neighbours[index]]),
+                    score=float(scores[index]),
+                    rank=rank,
+                )
+
+
+def compute_similar(top_k=10, chunk_size=500, batch_size=1000):
+    """Пересчитывает таблицу похожих рецептов.
+
+    Возвращает количество сохранённых пар.
+    """
+    matrix, recipe_ids = build_matrix()
+    created = 0
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        batch = []
+        for item in iter_similar(matrix, recipe_ids, top_k, chunk_size):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                SimilarRecipe.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        SimilarRecipe.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,17 @@
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище файлов с именами по хешу содержимого.
+
+    Файл с тем же именем уже содержит те же байты, поэтому повторная
+    загрузка возвращает существующее имя и ничего не записывает, а не
+    создаёт копию с суффиксом.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is not None and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,128 @@
+"""Маска тегов рецепта: Recipe.tags_mask — сумма 2 ** Tag.bit по тегам.
+
+Фильтр ленты по тегам сводится к условию на одну колонку рецепта вместо
+JOIN с таблицей связей и DISTINCT. Маска обновляется по m2m_changed,
+при удалении тега, командой backfill_tags_mask; сверяет её с таблицей
+связей команда check_tags_mask.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Recipe, Tag
+from .versions import touch_recipes
+
+
+def mask_of(bits):
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def compute_masks(recipe_ids, recipe_model=Recipe):
+    """Маски рецептов по таблице связей, {id рецепта: маска}."""
+    masks = dict.fromkeys(recipe_ids, 0)
+    rows = recipe_model.tags.through.objects.filter(
+        recipe_id__in=masks
+    ).values_list("recipe_id", "tag__bit")
+    for recipe_id, bit in rows:
+        masks[recipe_id] |= 1 << bit
+    return masks
+
+
+def save_masks(masks, recipe_model=Recipe, batch_size=1000):
+    """Записывает маски, одним UPDATE на каждое значение маски
+    в пачке из batch_size рецептов."""
+    by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        by_mask[mask].append(recipe_id)
+    for mask, recipe_ids in by_mask.items():
+        for start in range(0, len(recipe_ids), batch_size):
+            recipe_model.objects.filter(
+                id__in=recipe_ids[start:start + batch_size]
+            ).update(tags_mask=mask)
+
+
+def update_masks(recipe_ids, recipe_model=Recipe):
+    save_masks(compute_masks(recipe_ids, recipe_model), recipe_model)
+
+
+def iter_batches(batch_size, recipe_model=Recipe):
+    """id рецептов пачками по batch_size в порядке id."""
+    last_id = 0
+    while True:
+        batch = list(
+            recipe_model.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def backfill(batch_size=1000, recipe_model=Recipe):
+    """Пересчитывает маски всех рецептов, возвращает их число."""
+    count = 0
+    for batch in iter_batches(batch_size, recipe_model):
+        update_masks(batch, recipe_model)
+        count += len(batch)
+    return count
+
+
+def filter_by_tags(queryset, tags):
+    """Рецепты queryset, у которых есть хотя бы один из тегов tags.
+
+    Пока тегов немного, условие — tags_mask IN (все маски, пересекающиеся
+    с выбранными), его обслуживает индекс recipe_tags_mask_idx. Иначе —
+    побитовое И, которое проверяется для каждой строки.
+    """
+    mask = mask_of(tag.bit for tag in tags)
+    used = mask_of(Tag.objects.values_list("bit", flat=True)) | mask
+    if bin(used).count("1") > settings.TAGS_MASK_IN_LIST_BITS:
+        return queryset.alias(
+            tags_mask_match=F("tags_mask").bitand(mask)
+        ).filter(tags_mask_match__gt=0)
+    masks = []
+    submask = used
+    while submask:
+        if submask & mask:
+            masks.append(submask)
+        submask = (submask - 1) & used
+    return queryset.filter(tags_mask__in=masks)
+
+
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет маски и время изменения рецептов после изменения
+    их тегов."""
+    if action == "pre_clear" and reverse:
+        # После очистки тега уже не узнать, у каких рецептов он был.
+        instance._mask_recipe_ids = list(
+            instance.recipes.values_list("id", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == "post_clear":
+        recipe_ids = instance.__dict__.pop("_mask_recipe_ids", [])
+    else:
+        recipe_ids = list(pk_set)
+    update_masks(recipe_ids)
+    touch_recipes(Recipe.objects.filter(id__in=recipe_ids))
+
+
+def tag_deleted(sender, instance, **kwargs):
+    """Снимает бит удаляемого тега с рецептов.
+
+    Связи удаляются каскадом без m2m_changed, поэтому маска
+    правится до удаления.
+    """
+    Recipe.objects.filter(tags=instance).update(
+        tags_mask=F("tags_mask").bitand(~(1 << instance.bit)),
+        updated_at=timezone.now(),
+    )
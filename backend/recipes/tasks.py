@@ -0,0 +1,57 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from jobs.queue import task
+
+from .models import Ingredient
+from .shopping_list import write_export
+from .trending import compute_scores
+
+
+@task("recipes.import_ingredients")
+def import_ingredients(path, batch_size=1000):
+    """Загружает ингредиенты из JSON, уже существующие пропускаются."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    before = Ingredient.objects.count()
+    with transaction.atomic():
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(
+                    name=item["name"],
+                    measurement_unit=item["measurement_unit"],
+                )
+                for item in data
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+    # bulk_create не отправляет сигналы, снимок каталога
+    # пересобирается явно.
+    if settings.CATALOGUE_SNAPSHOT_PATH:
+        call_command("build_catalogue_snapshot")
+    return {"created": Ingredient.objects.count() - before}
+
+
+@task("recipes.compute_trending")
+def compute_trending():
+    return {"recipes": compute_scores()}
+
+
+@task("recipes.compute_similar")
+def compute_similar_recipes(top_k=10):
+    # numpy и scipy импортируются только в воркере: модуль задач
+    # загружается при django.setup() в каждом процессе веба и API.
+    from .similarity import compute_similar
+
+    return {"pairs": compute_similar(top_k=top_k)}
+
+
+@task("recipes.render_shopping_list")
+def render_shopping_list(rows, export_type):
+    """Выгрузка списка покупок в файл, rows — из get_shopping_list."""
+    path = write_export([tuple(row) for row in rows], export_type)
+    return {"file": os.path.basename(path), "bytes": os.path.getsize(path)}
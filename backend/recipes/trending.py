@@ -0,0 +1,71 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Favorite, RecipeScore, ShopingList
+
+
+def get_sources():
+    """Источники событий популярности: модель, поле даты и вес события."""
+    return (
+        (Favorite, "date_added", settings.TRENDING_FAVORITE_WEIGHT),
+        (ShopingList, "date_add", settings.TRENDING_CART_WEIGHT),
+    )
+
+
+def compute_scores(now=None):
+    """Пересчитывает рейтинги популярности всех рецептов.
+
+    События за окно TRENDING_WINDOW_DAYS агрегируются в базе одним
+    сгруппированным запросом на источник (рецепт, час), вклад каждого часа
+    затухает экспоненциально с периодом полураспада TRENDING_HALF_LIFE_HOURS.
+    Возвращает количество рецептов с ненулевым рейтингом.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS
+    scores = defaultdict(float)
+    for model, date_field, weight in get_sources():
+        rows = (
+            model.objects.filter(**{f"{date_field}__gte": since})
+            .annotate(bucket=TruncHour(date_field))
+            .order_by()
+            .values("recipe_id", "bucket")
+            .annotate(events=Count("id"))
+            .values_list("recipe_id", "bucket", "events")
+        )
+        for recipe_id, bucket, events in rows.iterator():
+            age = max((now - bucket).total_seconds(), 0) / 3600
+            scores[recipe_id] += weight * events * 0.5 ** (age / half_life)
+
+    with transaction.atomic():
+        RecipeScore.objects.all().delete()
+        RecipeScore.objects.bulk_create(
+            [
+                RecipeScore(recipe_id=recipe_id, value=value)
+                for recipe_id, value in scores.items()
+            ],
+            batch_size=1000,
+        )
+    return len(scores)
+
+
+def bump_score(recipe, weight):
+    """Увеличивает рейтинг рецепта между пересчётами."""
+    updated = RecipeScore.objects.filter(recipe=recipe).update(
+        value=F("value") + weight
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            RecipeScore.objects.create(recipe=recipe, value=weight)
+    except IntegrityError:
+        RecipeScore.objects.filter(recipe=recipe).update(
+            value=F("value") + weight
+        )
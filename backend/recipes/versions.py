@@ -0,0 +1,41 @@
+"""Время изменения рецепта для условных GET-запросов.
+
+Recipe.updated_at обновляется при сохранении рецепта (auto_now), а также
+при изменении его ингредиентов и тегов и при правке самих ингредиентов,
+тегов и автора: от них зависит карточка рецепта в API.
+"""
+from django.utils import timezone
+
+from .models import Recipe
+
+# Поля автора, которые выводятся в карточке рецепта.
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name"}
+
+
+def touch_recipes(queryset):
+    """Обновляет updated_at рецептов queryset одним UPDATE."""
+    return queryset.update(updated_at=timezone.now())
+
+
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+def ingredient_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    if created or (
+        update_fields is not None
+        and AUTHOR_FIELDS.isdisjoint(update_fields)
+    ):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
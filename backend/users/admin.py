@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import MyUser
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(MyUser)
@@ -13,11 +14,15 @@ class MyUserAdmin(admin.ModelAdmin):
         'is_subscribed'
     )
     list_filter = (
-        'email',
-        'first_name',
-        'is_subscribed'
+        'is_subscribed',
+        'is_staff',
+        'is_active',
     )
     search_fields = (
-        'username',
-        'email'
+        '^username',
+        '^email',
+        'first_name',
+        'last_name',
     )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import foodgram.indexes
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, без блокировки записи в таблицы.
+    atomic = False
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        foodgram.indexes.AddIndexConcurrently(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+    ]
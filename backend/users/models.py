@@ -54,6 +54,13 @@ class Follow(models.Model):
                 fields=("user", "author"), name="follow_user_author_unique"
             ),
         )
+        # Уникальное ограничение покрывает выборки по подписчику,
+        # этот индекс — выборки по автору.
+        indexes = (
+            models.Index(
+                fields=("author", "user"), name="follow_author_user_idx"
+            ),
+        )
 
     def __str__(self):
         return f"Пользователь: {self.user}, Автор: {self.author}"
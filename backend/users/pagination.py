@@ -1,3 +1,8 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -5,3 +10,41 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 20
+
+
+def estimated_count(model, using):
+    """Оценка числа строк таблицы по статистике PostgreSQL или None."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 или 0, если таблицу ещё не анализировали.
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки без COUNT(*) по большим таблицам.
+
+    Для списка без фильтров и поиска число строк берётся из статистики
+    планировщика, если оно больше ADMIN_EXACT_COUNT_LIMIT. Отфильтрованные
+    списки и небольшие таблицы считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if (
+                estimate is not None
+                and estimate > settings.ADMIN_EXACT_COUNT_LIMIT
+            ):
+                return estimate
+        return super().count